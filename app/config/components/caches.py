@@ -0,0 +1,33 @@
+import os
+
+
+MOVIES_API_CACHE = {
+    # '' - без кэша, locmem - память процесса, redis - общий Redis
+    'BACKEND': os.environ.get('MOVIES_API_CACHE', ''),
+    'TIMEOUT': int(os.environ.get('MOVIES_API_CACHE_TIMEOUT', 300)),
+    'LOCK_TIMEOUT': float(os.environ.get('MOVIES_API_CACHE_LOCK_TIMEOUT',
+                                         5.0))
+}
+
+# запас на фиксацию транзакции после записи в журнал изменений списка:
+# пока последняя запись моложе, список не кэшируется и не валидируется
+MOVIES_API_WATERMARK_SETTLE = float(
+    os.environ.get('MOVIES_API_WATERMARK_SETTLE', 2.0)
+)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'movies_api': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'movies_api',
+    }
+}
+
+if MOVIES_API_CACHE['BACKEND'] == 'redis':
+    CACHES['movies_api'] = {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': os.environ.get('MOVIES_API_CACHE_URL',
+                                   'redis://127.0.0.1:6379/1'),
+    }
@@ -0,0 +1,16 @@
+import os
+
+
+MOVIES_API_ELASTICSEARCH = (
+    os.environ.get('MOVIES_API_ELASTICSEARCH', 'False') == 'True'
+)
+
+ELASTICSEARCH = {
+    'HOST': os.environ.get('ES_HOST', '127.0.0.1'),
+    'PORT': os.environ.get('ES_PORT', 9200),
+    'MOVIES_INDEX': os.environ.get('MOVIES_INDEX', 'movies'),
+    'POOL_SIZE': int(os.environ.get('ES_POOL_SIZE', 10)),
+    'REQUEST_TIMEOUT': float(os.environ.get('ES_REQUEST_TIMEOUT', 2.0)),
+    # за сколько секунд ETL гарантированно доставляет изменение в индекс
+    'MAX_LAG': float(os.environ.get('ES_MAX_LAG', 60.0))
+}
@@ -20,13 +20,17 @@ ROOT_URLCONF = 'config.urls'
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+TEST_RUNNER = 'movies.tests.runner.ContentSchemaRunner'
+
 include(
     'components/apps.py',
     'components/middleware.py',
     'components/templates.py',
     'components/auth_password_validatos.py',
     'components/database.py',
-    'components/internationalization.py'
+    'components/internationalization.py',
+    'components/elasticsearch.py',
+    'components/caches.py'
 )
 
 STATIC_URL = '/static/'
@@ -1,48 +1,84 @@
-from django.http import JsonResponse
+import datetime
+import logging
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
 from django.views.generic.list import BaseListView
 from django.views.generic.detail import BaseDetailView
-from django.contrib.postgres.aggregates import ArrayAgg
 from django.db.models import Q
+from django.db.models.functions import Collate
+from elasticsearch import ApiError, TransportError
+
+from movies import cache
+from movies.models import Filmwork, FilmworkDocument
+from movies.pagination import estimate_count, paginate_keyset
+from movies.search import MovieSearch, get_movie
+from movies.watermarks import (WatermarkType, get_film_watermark,
+                               get_list_watermark)
+
 
-from movies.models import Filmwork, PersonFilmwork
+logger = logging.getLogger(__name__)
 
 
-class MoviesApiMixin:
+class MoviesApiMixin(ABC):
     model = Filmwork
     http_method_names = ['get']
+    search_errors = (ApiError, TransportError)
+
+    def use_search(self) -> bool:
+        return settings.MOVIES_API_ELASTICSEARCH
+
+    @abstractmethod
+    def get_cache_key(self) -> str:
+        """Ключ кэша ответа для self.watermark."""
+
+    @abstractmethod
+    def get_watermark(self) -> WatermarkType:
+        """Момент последнего изменения данных ответа."""
+
+    def is_settled(self, watermark: datetime.datetime) -> bool:
+        # пока ETL может не доставить изменение в индекс, ответ
+        # из Elasticsearch может быть устаревшим
+        if not self.use_search():
+            return True
+        lag = (timezone.now() - watermark).total_seconds()
+        return lag >= settings.ELASTICSEARCH['MAX_LAG']
+
+    def get(self, request, *args, **kwargs):
+        # версия данных проверяется до тяжелого запроса,
+        # неизмененные данные отдаются ответом 304
+        watermark = self.get_watermark()
+        if watermark is None or not self.is_settled(watermark):
+            # устаревший ответ нельзя подтверждать ответами 304
+            # и кэшировать
+            return super().get(request, *args, **kwargs)
+        self.watermark = watermark
+        etag = f'W/"{watermark.timestamp():.6f}"'
+        respond = condition(
+            etag_func=lambda *_, **__: etag,
+            last_modified_func=lambda *_, **__: watermark
+        )
+        return respond(self.get_response)(request, *args, **kwargs)
+
+    def get_response(self, request, *args, **kwargs):
+        if not cache.is_enabled():
+            return super().get(request, *args, **kwargs)
+        content = cache.get_or_build(
+            self.get_cache_key(),
+            lambda: super(MoviesApiMixin, self).get(
+                request, *args, **kwargs).content
+        )
+        return HttpResponse(content, content_type='application/json')
 
     def get_queryset(self):
-        roles = PersonFilmwork.Roles
-
-        queryset = (
-            self.model.objects
-                .all()
-                .values(
-                    'id', 'title', 'description', 'creation_date',
-                    'rating', 'type')
-                .annotate(
-                    genres=ArrayAgg(
-                        'genres__name',
-                        distinct=True,
-                        filter=Q(genrefilmwork__pk__isnull=False)
-                    ),
-                    actors=ArrayAgg(
-                        'persons__full_name',
-                        distinct=True,
-                        filter=Q(personfilmwork__role=roles.ACTOR)
-                    ),
-                    directors=ArrayAgg(
-                        'persons__full_name',
-                        distinct=True,
-                        filter=Q(personfilmwork__role=roles.DIRECTOR)
-                    ),
-                    writers=ArrayAgg(
-                        'persons__full_name',
-                        distinct=True,
-                        filter=Q(personfilmwork__role=roles.WRITER)
-                    ))
+        # связанные записи собраны триггерами в одну строку
+        return FilmworkDocument.objects.values(
+            'id', 'title', 'description', 'creation_date', 'rating', 'type',
+            'genres', 'actors', 'directors', 'writers'
         )
-        return queryset
 
     def render_to_response(self, context, **response_kwargs):
         return JsonResponse(context)
@@ -51,9 +87,70 @@ class MoviesApiMixin:
 class MoviesListApi(MoviesApiMixin, BaseListView):
     paginate_by = 50
 
+    def get_cache_key(self):
+        query = sorted(self.request.GET.lists())
+        return cache.list_key(repr(query), self.watermark)
+
+    def get_watermark(self):
+        return get_list_watermark()
+
     def get_context_data(self, *, object_list=None, **kwargs):
-        queryset = self.get_queryset()
+        # ?cursor= включает постраничный вывод по (title, id)
+        # без COUNT и OFFSET
+        keyset = 'cursor' in self.request.GET
+        if self.use_search():
+            try:
+                search = MovieSearch()
+                if keyset:
+                    return self.paginate_keyset(search.keyset, search.count)
+                return self.paginate(search)
+            except self.search_errors as e:
+                logger.warning('Elasticsearch недоступен, '
+                               'выдача из Postgres: %s', e)
+        if keyset:
+            return self.paginate_keyset(self.fetch_keyset, self.count)
+        # тот же порядок, что у MovieSearch, чтобы ?page=N не зависел
+        # от доступности Elasticsearch
+        return self.paginate(self.get_queryset().order_by('id'))
+
+    def fetch_keyset(self, position, backward, limit):
+        # побайтовый порядок, как у keyword-поля title.raw в индексе,
+        # чтобы курсор, выданный Elasticsearch, продолжался в Postgres
+        queryset = self.get_queryset().alias(
+            title_c=Collate('title', 'C')
+        )
+        if position:
+            title, id = position
+            if backward:
+                queryset = queryset.filter(
+                    Q(title_c__lte=title)
+                    & (Q(title_c__lt=title) | Q(id__lt=id))
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(title_c__gte=title)
+                    & (Q(title_c__gt=title) | Q(id__gt=id))
+                )
+        order = ('-title_c', '-id') if backward else ('title_c', 'id')
+        return list(queryset.order_by(*order)[:limit])
+
+    def count(self):
+        # точное кол-во только по запросу, иначе оценка из статистики
+        if self.request.GET.get('count') == 'exact':
+            return self.model.objects.count()
+        return estimate_count(self.model._meta.db_table.replace('"', ''))
 
+    def paginate_keyset(self, fetch, count):
+        size = self.get_paginate_by(None)
+        page = paginate_keyset(fetch, self.request.GET['cursor'], size)
+        total = count()
+        return {
+            'count': total,
+            'total_pages': -(-total // size),
+            **page
+        }
+
+    def paginate(self, queryset):
         paginator, page, queryset, _ = self.paginate_queryset(
             queryset,
             self.paginate_by
@@ -75,7 +172,23 @@ class MoviesListApi(MoviesApiMixin, BaseListView):
 
 class MoviesDetailApi(MoviesApiMixin, BaseDetailView):
 
+    def get_cache_key(self):
+        return cache.detail_key(self.kwargs.get(self.pk_url_kwarg),
+                                self.watermark)
+
+    def get_watermark(self):
+        return get_film_watermark(self.kwargs.get(self.pk_url_kwarg))
+
+    def get_object(self, queryset=None):
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        if self.use_search():
+            try:
+                return get_movie(pk)
+            except self.search_errors as e:
+                # документ мог еще не дойти до индекса
+                logger.warning('Кинопроизведение %s не получено '
+                               'из Elasticsearch: %s', pk, e)
+        return super().get_object(queryset)
+
     def get_context_data(self, *, object_list=None, **kwargs):
-        pk = self.kwargs.get('pk')
-        queryset = self.get_queryset().get(pk=pk)
-        return queryset
+        return self.object
@@ -0,0 +1,115 @@
+import datetime
+import hashlib
+import time
+from typing import Callable, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+LIST_VERSION_KEY = 'movies:list:version'
+"""Ключ поколения списков: при любом изменении каталога
+все закэшированные страницы списка устаревают."""
+
+
+def get_cache():
+    return caches['movies_api']
+
+
+def is_enabled() -> bool:
+    return bool(settings.MOVIES_API_CACHE['BACKEND'])
+
+
+def get_version(key: str) -> int:
+    """Получить версию записей кэша.
+
+    Новая версия начинается со времени в наносекундах, поэтому
+    вытесненный из кэша счетчик не вернется к старому значению.
+    """
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key: str):
+    """Сменить версию, чтобы записи старой версии больше не читались."""
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def film_version_key(pk) -> str:
+    return f'movies:film:{pk}:version'
+
+
+def list_key(query: str, watermark: datetime.datetime) -> str:
+    """Ключ страницы списка для строки запроса.
+
+    Момент изменения данных входит в ключ, поэтому закэшированный ответ
+    всегда соответствует отданным с ним ETag и Last-Modified, даже если
+    изменение прошло мимо сигналов. Версия, которую сдвигают сигналы,
+    только сбрасывает кэш раньше.
+    """
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return (f'movies:list:{get_version(LIST_VERSION_KEY)}:'
+            f'{watermark.timestamp():.6f}:{digest}')
+
+
+def detail_key(pk, watermark: datetime.datetime) -> str:
+    """Ключ Кинопроизведения с моментом его изменения."""
+    return (f'movies:detail:{pk}:{get_version(film_version_key(pk))}:'
+            f'{watermark.timestamp():.6f}')
+
+
+def get_or_build(key: str, build: Callable[[], bytes]) -> bytes:
+    """Получить ответ из кэша или собрать его.
+
+    Собирает ответ только один запрос: остальные, промахнувшиеся
+    по тому же ключу, ждут его результата до LOCK_TIMEOUT секунд.
+    """
+    cache = get_cache()
+    content = cache.get(key)
+    if content is not None:
+        return content
+
+    lock_timeout = settings.MOVIES_API_CACHE['LOCK_TIMEOUT']
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            content = build()
+            cache.set(key, content, settings.MOVIES_API_CACHE['TIMEOUT'])
+        finally:
+            cache.delete(lock_key)
+        return content
+
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        content = cache.get(key)
+        if content is not None:
+            return content
+    return build()
+
+
+def invalidate(film_ids: Iterable):
+    """Сбросить кэш Кинопроизведений и списков после фиксации транзакции.
+
+    До фиксации параллельный запрос прочитал бы старые данные
+    и снова закэшировал бы их под новой версией.
+    """
+    if not is_enabled():
+        return
+    film_ids = list(film_ids)
+
+    def bump():
+        for pk in film_ids:
+            bump_version(film_version_key(pk))
+        bump_version(LIST_VERSION_KEY)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+TABLES = (
+    'film_work',
+    'genre',
+    'person',
+    'genre_film_work',
+    'person_film_work',
+)
+
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION content.notify_change() RETURNS trigger AS $$
+DECLARE
+    rec jsonb;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        rec := to_jsonb(OLD);
+    ELSE
+        rec := to_jsonb(NEW);
+    END IF;
+    PERFORM pg_notify(
+        'content_changes',
+        jsonb_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', rec->>'id',
+            'film_work_id', rec->>'film_work_id'
+        )::text
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+CREATE_TRIGGER = """
+CREATE TRIGGER {table}_notify_change
+    AFTER INSERT OR UPDATE OR DELETE ON content.{table}
+    FOR EACH ROW EXECUTE PROCEDURE content.notify_change();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS {table}_notify_change ON content.{table};
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_FUNCTION,
+                          'DROP FUNCTION IF EXISTS content.notify_change();'),
+    ] + [
+        migrations.RunSQL(CREATE_TRIGGER.format(table=table),
+                          DROP_TRIGGER.format(table=table))
+        for table in TABLES
+    ]
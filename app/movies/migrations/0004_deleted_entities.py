@@ -0,0 +1,72 @@
+from django.db import migrations
+
+
+TABLES = (
+    'film_work',
+    'genre',
+    'person',
+    'genre_film_work',
+    'person_film_work',
+)
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS content.deleted_entities (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+    table_name text NOT NULL,
+    entity_id uuid NOT NULL,
+    film_work_id uuid,
+    person_id uuid,
+    -- момент удаления строки, а не начала транзакции: ETL читает
+    -- записи старше TOMBSTONE_SETTLE_SECONDS, и долгая транзакция
+    -- с now() попала бы за уже прочитанную позицию курсора
+    deleted_at timestamp with time zone NOT NULL DEFAULT clock_timestamp()
+);
+CREATE INDEX IF NOT EXISTS deleted_entities_deleted_at_idx
+    ON content.deleted_entities (deleted_at, id);
+"""
+
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION content.record_deletion() RETURNS trigger AS $$
+DECLARE
+    rec jsonb := to_jsonb(OLD);
+BEGIN
+    INSERT INTO content.deleted_entities
+        (table_name, entity_id, film_work_id, person_id)
+    VALUES (
+        TG_TABLE_NAME,
+        (rec->>'id')::uuid,
+        (rec->>'film_work_id')::uuid,
+        (rec->>'person_id')::uuid
+    );
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+CREATE_TRIGGER = """
+CREATE TRIGGER {table}_record_deletion
+    AFTER DELETE ON content.{table}
+    FOR EACH ROW EXECUTE PROCEDURE content.record_deletion();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS {table}_record_deletion ON content.{table};
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_change_notify_triggers'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TABLE,
+                          'DROP TABLE IF EXISTS content.deleted_entities;'),
+        migrations.RunSQL(CREATE_FUNCTION,
+                          'DROP FUNCTION IF EXISTS content.record_deletion();'),
+    ] + [
+        migrations.RunSQL(CREATE_TRIGGER.format(table=table),
+                          DROP_TRIGGER.format(table=table))
+        for table in TABLES
+    ]
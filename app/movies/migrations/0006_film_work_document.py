@@ -0,0 +1,260 @@
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS content.film_work_document (
+    id uuid PRIMARY KEY,
+    imdb_rating double precision,
+    title varchar(255) NOT NULL,
+    description text,
+    creation_date date,
+    file_url varchar(100),
+    type varchar(255) NOT NULL,
+    genres_names text[] NOT NULL,
+    actors_names text[] NOT NULL,
+    writers_names text[] NOT NULL,
+    directors_names text[] NOT NULL,
+    genres jsonb NOT NULL,
+    actors jsonb NOT NULL,
+    writers jsonb NOT NULL,
+    directors jsonb NOT NULL,
+    updated_at timestamp with time zone NOT NULL,
+    version_at timestamp with time zone NOT NULL
+);
+-- порядок "C" совпадает с побайтовым порядком keyword-поля в индексе ES
+CREATE INDEX IF NOT EXISTS film_work_document_title_idx
+    ON content.film_work_document (title COLLATE "C", id);
+"""
+
+CREATE_REFRESH_FUNCTION = """
+CREATE OR REPLACE FUNCTION content.refresh_film_work_document(
+    film_ids uuid[]
+) RETURNS void AS $$
+BEGIN
+    -- параллельная пересборка того же Кинопроизведения ждет фиксации
+    -- первой, и следующие запросы функции видят ее изменения;
+    -- без блокировки сборка из старого снимка затерла бы новую строку
+    PERFORM 1
+    FROM content.film_work
+    WHERE id = ANY(film_ids)
+    ORDER BY id
+    FOR UPDATE;
+
+    DELETE FROM content.film_work_document d
+    WHERE d.id = ANY(film_ids)
+        AND NOT EXISTS (
+            SELECT 1 FROM content.film_work fw WHERE fw.id = d.id
+        );
+
+    INSERT INTO content.film_work_document
+    SELECT
+        fw.id,
+        fw.rating,
+        fw.title,
+        fw.description,
+        fw.creation_date,
+        fw.file_path,
+        fw.type,
+        COALESCE(array_agg(DISTINCT g.name)
+            FILTER (WHERE g.id IS NOT NULL), '{}'),
+        COALESCE(array_agg(DISTINCT p.full_name)
+            FILTER (WHERE pfw.role = 'actor'), '{}'),
+        COALESCE(array_agg(DISTINCT p.full_name)
+            FILTER (WHERE pfw.role = 'writer'), '{}'),
+        COALESCE(array_agg(DISTINCT p.full_name)
+            FILTER (WHERE pfw.role = 'director'), '{}'),
+        COALESCE(jsonb_agg(DISTINCT jsonb_build_object(
+            'id', g.id, 'name', g.name))
+            FILTER (WHERE g.id IS NOT NULL), '[]'),
+        COALESCE(jsonb_agg(DISTINCT jsonb_build_object(
+            'id', p.id, 'name', p.full_name))
+            FILTER (WHERE pfw.role = 'actor'), '[]'),
+        COALESCE(jsonb_agg(DISTINCT jsonb_build_object(
+            'id', p.id, 'name', p.full_name))
+            FILTER (WHERE pfw.role = 'writer'), '[]'),
+        COALESCE(jsonb_agg(DISTINCT jsonb_build_object(
+            'id', p.id, 'name', p.full_name))
+            FILTER (WHERE pfw.role = 'director'), '[]'),
+        fw.updated_at,
+        GREATEST(
+            fw.updated_at,
+            MAX(p.updated_at),
+            MAX(pfw.created_at),
+            MAX(g.updated_at),
+            MAX(gfw.created_at)
+        )
+    FROM
+        content.film_work fw
+        LEFT JOIN content.person_film_work pfw
+            ON pfw.film_work_id = fw.id
+        LEFT JOIN content.person p
+            ON p.id = pfw.person_id
+        LEFT JOIN content.genre_film_work gfw
+            ON gfw.film_work_id = fw.id
+        LEFT JOIN content.genre g
+            ON g.id = gfw.genre_id
+    WHERE
+        fw.id = ANY(film_ids)
+    GROUP BY
+        fw.id
+    ON CONFLICT (id) DO UPDATE SET
+        imdb_rating = EXCLUDED.imdb_rating,
+        title = EXCLUDED.title,
+        description = EXCLUDED.description,
+        creation_date = EXCLUDED.creation_date,
+        file_url = EXCLUDED.file_url,
+        type = EXCLUDED.type,
+        genres_names = EXCLUDED.genres_names,
+        actors_names = EXCLUDED.actors_names,
+        writers_names = EXCLUDED.writers_names,
+        directors_names = EXCLUDED.directors_names,
+        genres = EXCLUDED.genres,
+        actors = EXCLUDED.actors,
+        writers = EXCLUDED.writers,
+        directors = EXCLUDED.directors,
+        updated_at = EXCLUDED.updated_at,
+        version_at = EXCLUDED.version_at;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+# триггеры уровня оператора получают все измененные строки разом,
+# поэтому массовая вставка связей пересобирает Кинопроизведение один раз
+CREATE_SYNC_FUNCTION = """
+CREATE OR REPLACE FUNCTION content.sync_film_work_document()
+RETURNS trigger AS $$
+DECLARE
+    film_ids uuid[];
+BEGIN
+    IF TG_TABLE_NAME = 'film_work' THEN
+        IF TG_OP = 'DELETE' THEN
+            film_ids := ARRAY(SELECT id FROM old_rows);
+        ELSE
+            film_ids := ARRAY(SELECT id FROM new_rows);
+        END IF;
+    ELSIF TG_TABLE_NAME = 'genre' THEN
+        film_ids := ARRAY(
+            SELECT DISTINCT gfw.film_work_id
+            FROM content.genre_film_work gfw
+                JOIN new_rows n ON n.id = gfw.genre_id
+        );
+    ELSIF TG_TABLE_NAME = 'person' THEN
+        film_ids := ARRAY(
+            SELECT DISTINCT pfw.film_work_id
+            FROM content.person_film_work pfw
+                JOIN new_rows n ON n.id = pfw.person_id
+        );
+    ELSIF TG_OP = 'INSERT' THEN
+        film_ids := ARRAY(SELECT DISTINCT film_work_id FROM new_rows);
+    ELSIF TG_OP = 'DELETE' THEN
+        film_ids := ARRAY(SELECT DISTINCT film_work_id FROM old_rows);
+    ELSE
+        film_ids := ARRAY(
+            SELECT film_work_id FROM new_rows
+            UNION
+            SELECT film_work_id FROM old_rows
+        );
+    END IF;
+    PERFORM content.refresh_film_work_document(film_ids);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+TRIGGERS = (
+    ('film_work', 'INSERT'),
+    ('film_work', 'UPDATE'),
+    ('film_work', 'DELETE'),
+    ('genre_film_work', 'INSERT'),
+    ('genre_film_work', 'UPDATE'),
+    ('genre_film_work', 'DELETE'),
+    ('person_film_work', 'INSERT'),
+    ('person_film_work', 'UPDATE'),
+    ('person_film_work', 'DELETE'),
+    # удаление жанра или персоны сначала удаляет их связи
+    ('genre', 'UPDATE'),
+    ('person', 'UPDATE'),
+)
+
+TRANSITION_TABLES = {
+    'INSERT': 'NEW TABLE AS new_rows',
+    'UPDATE': 'OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'DELETE': 'OLD TABLE AS old_rows',
+}
+
+CREATE_TRIGGER = """
+CREATE TRIGGER {table}_document_{event}
+    AFTER {event} ON content.{table}
+    REFERENCING {transition}
+    FOR EACH STATEMENT EXECUTE PROCEDURE content.sync_film_work_document();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS {table}_document_{event} ON content.{table};
+"""
+
+FILL_TABLE = """
+SELECT content.refresh_film_work_document(
+    ARRAY(SELECT id FROM content.film_work)
+);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_title_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TABLE,
+                          'DROP TABLE IF EXISTS content.film_work_document;'),
+        migrations.RunSQL(
+            CREATE_REFRESH_FUNCTION,
+            'DROP FUNCTION IF EXISTS '
+            'content.refresh_film_work_document(uuid[]);'
+        ),
+        migrations.RunSQL(
+            CREATE_SYNC_FUNCTION,
+            'DROP FUNCTION IF EXISTS content.sync_film_work_document();'
+        ),
+    ] + [
+        migrations.RunSQL(
+            CREATE_TRIGGER.format(table=table, event=event,
+                                  transition=TRANSITION_TABLES[event]),
+            DROP_TRIGGER.format(table=table, event=event)
+        )
+        for table, event in TRIGGERS
+    ] + [
+        migrations.RunSQL(FILL_TABLE, migrations.RunSQL.noop),
+        migrations.CreateModel(
+            name='FilmworkDocument',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(null=True)),
+                ('creation_date', models.DateField(null=True)),
+                ('rating', models.FloatField(db_column='imdb_rating',
+                                             null=True)),
+                ('type', models.CharField(max_length=255)),
+                ('genres', django.contrib.postgres.fields.ArrayField(
+                    base_field=models.TextField(),
+                    db_column='genres_names', size=None)),
+                ('actors', django.contrib.postgres.fields.ArrayField(
+                    base_field=models.TextField(),
+                    db_column='actors_names', size=None)),
+                ('writers', django.contrib.postgres.fields.ArrayField(
+                    base_field=models.TextField(),
+                    db_column='writers_names', size=None)),
+                ('directors', django.contrib.postgres.fields.ArrayField(
+                    base_field=models.TextField(),
+                    db_column='directors_names', size=None)),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'content"."film_work_document',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,112 @@
+from django.db import migrations, models
+
+
+ADD_COLUMN = """
+ALTER TABLE content.film_work_document
+    ADD COLUMN IF NOT EXISTS refreshed_at timestamp with time zone
+        NOT NULL DEFAULT clock_timestamp();
+CREATE INDEX IF NOT EXISTS film_work_document_refreshed_at_idx
+    ON content.film_work_document (refreshed_at);
+"""
+
+DROP_COLUMN = """
+ALTER TABLE content.film_work_document DROP COLUMN IF EXISTS refreshed_at;
+"""
+
+# версия строки для условных запросов API меняется при каждой пересборке,
+# в том числе после удаления связи, которое не меняет updated_at
+CREATE_FUNCTION = """
+CREATE OR REPLACE FUNCTION content.touch_film_work_document()
+RETURNS trigger AS $$
+BEGIN
+    NEW.refreshed_at := clock_timestamp();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+CREATE_TRIGGER = """
+CREATE TRIGGER film_work_document_touch
+    BEFORE UPDATE ON content.film_work_document
+    FOR EACH ROW EXECUTE PROCEDURE content.touch_film_work_document();
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS film_work_document_touch
+    ON content.film_work_document;
+"""
+
+
+# каждая транзакция, изменившая film_work_document, добавляет свою строку
+# перед фиксацией (отложенный триггер), поэтому пишущие транзакции не ждут
+# друг друга; строка видна читателю через доли секунды после changed_at,
+# отсюда запас MOVIES_API_WATERMARK_SETTLE при чтении
+CREATE_WATERMARK = """
+CREATE TABLE IF NOT EXISTS content.film_work_document_changes (
+    id bigserial PRIMARY KEY,
+    xact_id xid8 NOT NULL UNIQUE DEFAULT pg_current_xact_id(),
+    changed_at timestamp with time zone NOT NULL DEFAULT clock_timestamp()
+);
+CREATE INDEX IF NOT EXISTS film_work_document_changes_changed_at_idx
+    ON content.film_work_document_changes (changed_at);
+INSERT INTO content.film_work_document_changes DEFAULT VALUES;
+
+CREATE OR REPLACE FUNCTION content.log_film_work_document_change()
+RETURNS trigger AS $$
+DECLARE
+    change_id bigint;
+BEGIN
+    INSERT INTO content.film_work_document_changes DEFAULT VALUES
+    ON CONFLICT (xact_id) DO NOTHING
+    RETURNING id INTO change_id;
+    IF change_id IS NOT NULL THEN
+        -- последняя строка остается всегда, занятые строки чистит
+        -- следующая транзакция
+        DELETE FROM content.film_work_document_changes
+        WHERE id IN (
+            SELECT id FROM content.film_work_document_changes
+            WHERE changed_at < clock_timestamp() - interval '1 hour'
+                AND id < change_id
+            FOR UPDATE SKIP LOCKED
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER film_work_document_changes
+    AFTER INSERT OR UPDATE OR DELETE ON content.film_work_document
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW
+    EXECUTE PROCEDURE content.log_film_work_document_change();
+"""
+
+DROP_WATERMARK = """
+DROP TRIGGER IF EXISTS film_work_document_changes
+    ON content.film_work_document;
+DROP FUNCTION IF EXISTS content.log_film_work_document_change();
+DROP TABLE IF EXISTS content.film_work_document_changes;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0006_film_work_document'),
+    ]
+
+    operations = [
+        migrations.RunSQL(ADD_COLUMN, DROP_COLUMN),
+        migrations.RunSQL(
+            CREATE_FUNCTION,
+            'DROP FUNCTION IF EXISTS content.touch_film_work_document();'
+        ),
+        migrations.RunSQL(CREATE_TRIGGER, DROP_TRIGGER),
+        migrations.RunSQL(CREATE_WATERMARK, DROP_WATERMARK),
+        migrations.AddField(
+            model_name='filmworkdocument',
+            name='refreshed_at',
+            field=models.DateTimeField(default=None),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2 on 2026-10-18 03:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_film_work_document_refreshed_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='genrefilmwork',
+            index=models.Index(fields=['created_at', 'id'], name='genre_film_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='personfilmwork',
+            index=models.Index(fields=['created_at', 'id'], name='person_film_created_at_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import uuid
 
+from django.contrib.postgres.fields import ArrayField
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -32,6 +33,10 @@ class Genre(UUIDMixin, TimeStampedMixin):
         db_table = "content\".\"genre"
         verbose_name = _('genre')
         verbose_name_plural = _('genres')
+        indexes = [
+            models.Index(fields=['updated_at', 'id'],
+                         name='genre_updated_at_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['name'],
@@ -50,6 +55,10 @@ class Person(UUIDMixin, TimeStampedMixin):
         db_table = "content\".\"person"
         verbose_name = _('person')
         verbose_name_plural = _('persons')
+        indexes = [
+            models.Index(fields=['updated_at', 'id'],
+                         name='person_updated_at_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['full_name'],
@@ -85,6 +94,10 @@ class Filmwork(UUIDMixin, TimeStampedMixin):
         verbose_name_plural = _('filmworks')
         indexes = [
             models.Index(fields=['type'], name='film_work_type_idx'),
+            models.Index(fields=['updated_at', 'id'],
+                         name='film_work_updated_at_idx'),
+            models.Index(fields=['title', 'id'],
+                         name='film_work_title_idx'),
         ]
 
 
@@ -102,6 +115,10 @@ class GenreFilmwork(UUIDMixin):
         db_table = "content\".\"genre_film_work"
         verbose_name = _('filmwork genre')
         verbose_name_plural = _('filmwork genres')
+        indexes = [
+            models.Index(fields=['created_at', 'id'],
+                         name='genre_film_created_at_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['film_work_id', 'genre_id'],
@@ -132,9 +149,37 @@ class PersonFilmwork(UUIDMixin):
         db_table = "content\".\"person_film_work"
         verbose_name = _('filmwork person')
         verbose_name_plural = _('filmwork persons')
+        indexes = [
+            models.Index(fields=['created_at', 'id'],
+                         name='person_film_created_at_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['film_work_id', 'person_id', 'role'],
                 name='unique_film_work_person_role'
             ),
         ]
+
+
+class FilmworkDocument(models.Model):
+    """Кинопроизведение со связанными записями одной строкой.
+
+    Таблица поддерживается триггерами Postgres (миграция 0006)
+    и только читается.
+    """
+    id = models.UUIDField(primary_key=True)
+    title = models.CharField(max_length=255)
+    description = models.TextField(null=True)
+    creation_date = models.DateField(null=True)
+    rating = models.FloatField(db_column='imdb_rating', null=True)
+    type = models.CharField(max_length=255)
+    genres = ArrayField(models.TextField(), db_column='genres_names')
+    actors = ArrayField(models.TextField(), db_column='actors_names')
+    writers = ArrayField(models.TextField(), db_column='writers_names')
+    directors = ArrayField(models.TextField(), db_column='directors_names')
+    updated_at = models.DateTimeField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = "content\".\"film_work_document"
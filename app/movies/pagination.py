@@ -0,0 +1,89 @@
+import base64
+import json
+import uuid
+from typing import Callable, Optional
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+
+
+ESTIMATE_CACHE_KEY = 'movies:count_estimate'
+"""Префикс ключа кэша с оценкой кол-ва строк."""
+
+ESTIMATE_TIMEOUT = 300
+"""Сколько секунд хранить оценку кол-ва строк."""
+
+Position = Optional[list]
+"""Значения (title, id) строки, после которой начинается страница."""
+
+
+def encode_cursor(direction: str, row: dict) -> str:
+    """Собрать непрозрачный токен страницы от строки выдачи."""
+    data = json.dumps([direction, row['title'], str(row['id'])])
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_cursor(token: str) -> tuple[str, Position]:
+    """Разобрать токен страницы.
+
+    Raises:
+        Http404: Если токен поврежден
+
+    """
+    if not token:
+        return ('next', None)
+    try:
+        direction, title, id = json.loads(base64.urlsafe_b64decode(token))
+        uuid.UUID(id)
+    except (AttributeError, TypeError, ValueError):
+        raise Http404('Некорректный курсор страницы')
+    if (direction not in ('next', 'prev')
+            or not isinstance(title, str) or not isinstance(id, str)):
+        raise Http404('Некорректный курсор страницы')
+    return (direction, [title, id])
+
+
+def paginate_keyset(fetch: Callable[[Position, bool, int], list],
+                    token: str, size: int) -> dict:
+    """Получить страницу выдачи, упорядоченной по (title, id).
+
+    Args:
+        fetch: Функция, возвращающая limit строк после позиции
+               по возрастанию или, если backward, перед ней по убыванию
+        token: Токен страницы, пустой для первой страницы
+        size: Размер страницы
+
+    Returns:
+        dict: Токены соседних страниц и строки страницы
+
+    """
+    direction, position = decode_cursor(token)
+    backward = direction == 'prev'
+    rows = list(fetch(position, backward, size + 1))
+    has_more = len(rows) > size
+    rows = rows[:size]
+    if backward:
+        rows.reverse()
+
+    prev = next = None
+    if rows:
+        if has_more if backward else position:
+            prev = encode_cursor('prev', rows[0])
+        if backward or has_more:
+            next = encode_cursor('next', rows[-1])
+    return {'prev': prev, 'next': next, 'results': rows}
+
+
+def estimate_count(table: str) -> int:
+    """Получить оценку кол-ва строк таблицы из статистики Postgres,
+    закэшированную на ESTIMATE_TIMEOUT секунд."""
+    key = f'{ESTIMATE_CACHE_KEY}:{table}'
+    count = cache.get(key)
+    if count is None:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class '
+                           'WHERE oid = %s::regclass;', [table])
+            count = max(cursor.fetchone()[0], 0)
+        cache.set(key, count, ESTIMATE_TIMEOUT)
+    return count
@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Optional
+
+from django.conf import settings
+from elasticsearch import Elasticsearch
+
+
+MAX_RESULT_WINDOW = 10000
+"""Макс. глубина выдачи, доступная через from/size."""
+
+
+@lru_cache(maxsize=None)
+def get_client() -> Elasticsearch:
+    """Получить общий для всех запросов клиент Elasticsearch
+    с пулом keep-alive соединений."""
+    es = settings.ELASTICSEARCH
+    return Elasticsearch(f"http://{es['HOST']}:{es['PORT']}",
+                         connections_per_node=es['POOL_SIZE'],
+                         request_timeout=es['REQUEST_TIMEOUT'])
+
+
+def to_movie(source: dict) -> dict:
+    """Привести документ индекса movies к формату ответа API.
+
+    Args:
+        source: Документ индекса movies
+
+    Returns:
+        dict: Кинопроизведение в том же виде, что и из ORM
+
+    """
+    def names(field: str) -> list:
+        return sorted({item['name'] for item in source.get(field) or []})
+
+    return {
+        'id': source['id'],
+        'title': source['title'],
+        'description': source.get('description'),
+        'creation_date': source.get('creation_date'),
+        'rating': source.get('imdb_rating'),
+        'type': source['type'],
+        'genres': names('genres'),
+        'actors': names('actors'),
+        'directors': names('directors'),
+        'writers': names('writers'),
+    }
+
+
+def get_movie(pk) -> dict:
+    """Получить Кинопроизведение из индекса.
+
+    Args:
+        pk: id Кинопроизведения
+
+    Raises:
+        NotFoundError: Если документа нет в индексе
+
+    """
+    resp = get_client().get(index=settings.ELASTICSEARCH['MOVIES_INDEX'],
+                            id=str(pk))
+    return to_movie(resp['_source'])
+
+
+class MovieSearch:
+    """Выдача Кинопроизведений из индекса в виде последовательности,
+    которую постранично нарезает Paginator.
+
+    Страницы в пределах MAX_RESULT_WINDOW читаются через from/size,
+    более глубокие - переходами search_after по значениям сортировки.
+    """
+    sort = [{'id': 'asc'}]
+
+    def __init__(self):
+        self.es = get_client()
+        self.index = settings.ELASTICSEARCH['MOVIES_INDEX']
+
+    def count(self) -> int:
+        return self.es.count(index=self.index)['count']
+
+    def seek(self, offset: int):
+        """Получить значения сортировки документа перед offset.
+
+        Глубокая страница ?page= стоит offset / MAX_RESULT_WINDOW
+        запросов, поэтому ответы сведены к значениям сортировки;
+        постоянную цену страницы дает только ?cursor=.
+        """
+        search_after = None
+        while offset > 0:
+            size = min(offset, MAX_RESULT_WINDOW)
+            resp = self.es.search(index=self.index, sort=self.sort,
+                                  source=False, size=size,
+                                  search_after=search_after,
+                                  track_total_hits=False,
+                                  filter_path=['hits.hits.sort'])
+            # без совпадений filter_path убирает hits из ответа
+            hits = resp.body.get('hits', {}).get('hits', [])
+            if not hits:
+                break
+            search_after = hits[-1]['sort']
+            offset -= len(hits)
+        return search_after
+
+    def keyset(self, position: Optional[list], backward: bool,
+               limit: int) -> list:
+        """Получить limit документов после позиции (title, id)
+        или, если backward, перед ней в обратном порядке."""
+        order = 'desc' if backward else 'asc'
+        hits = self.es.search(index=self.index,
+                              sort=[{'title.raw': order}, {'id': order}],
+                              size=limit,
+                              search_after=position)['hits']['hits']
+        return [to_movie(hit['_source']) for hit in hits]
+
+    def __getitem__(self, page: slice) -> list:
+        start, stop = page.start or 0, page.stop
+        params = {'index': self.index, 'sort': self.sort,
+                  'size': stop - start}
+        if stop <= MAX_RESULT_WINDOW:
+            params['from_'] = start
+        else:
+            params['search_after'] = self.seek(start)
+        hits = self.es.search(**params)['hits']['hits']
+        return [to_movie(hit['_source']) for hit in hits]
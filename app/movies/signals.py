@@ -1,10 +1,56 @@
 import datetime
 
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
+from movies import cache
+from movies.models import (Filmwork, Genre, GenreFilmwork, Person,
+                           PersonFilmwork)
+
 
 @receiver(post_save, sender='movies.Filmwork')
 def attention(sender, instance, created, **kwargs):
     if created and instance.creation_date == datetime.date.today():
         print(f'Сегодня премьера {instance.title}')
+
+
+@receiver(post_save, sender=Filmwork)
+@receiver(post_delete, sender=Filmwork)
+def invalidate_filmwork(sender, instance, **kwargs):
+    cache.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=GenreFilmwork)
+@receiver(post_delete, sender=GenreFilmwork)
+@receiver(post_save, sender=PersonFilmwork)
+@receiver(post_delete, sender=PersonFilmwork)
+def invalidate_link(sender, instance, **kwargs):
+    cache.invalidate([instance.film_work_id])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_save, sender=Person)
+def invalidate_related(sender, instance, **kwargs):
+    # имя жанра или персоны входит в ответы всех ее Кинопроизведений
+    cache.invalidate(instance.filmwork_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Genre)
+@receiver(post_delete, sender=Person)
+def invalidate_deleted(sender, instance, **kwargs):
+    # связи удаляются каскадом и сбрасывают свои Кинопроизведения сами
+    cache.invalidate([])
+
+
+@receiver(m2m_changed, sender=GenreFilmwork)
+@receiver(m2m_changed, sender=PersonFilmwork)
+def invalidate_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            cache.invalidate([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        cache.invalidate(pk_set)
+    elif action == 'pre_clear':
+        # после очистки связей со стороны жанра или персоны
+        # их Кинопроизведения уже не найти
+        cache.invalidate(instance.filmwork_set.values_list('pk', flat=True))
@@ -0,0 +1,24 @@
+from django.db import connections
+from django.db.models.signals import pre_migrate
+from django.test.runner import DiscoverRunner
+
+
+def create_schema(sender, app_config, using, **kwargs):
+    if app_config.label == 'movies':
+        with connections[using].cursor() as cursor:
+            cursor.execute('CREATE SCHEMA IF NOT EXISTS content;')
+
+
+class ContentSchemaRunner(DiscoverRunner):
+    """Запуск тестов с созданием схемы content в тестовой БД.
+
+    В рабочей БД схему создает db/init.sql, а миграции рассчитывают
+    на ее наличие.
+    """
+
+    def setup_databases(self, **kwargs):
+        pre_migrate.connect(create_schema)
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            pre_migrate.disconnect(create_schema)
@@ -0,0 +1,123 @@
+import datetime
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from movies import cache
+from movies.api.v1.views import MoviesListApi
+from movies.models import Filmwork, Genre
+
+
+WATERMARK = timezone.now()
+"""Момент изменения данных в ключах кэша."""
+
+CACHE_SETTINGS = {'BACKEND': 'locmem', 'TIMEOUT': 300, 'LOCK_TIMEOUT': 5.0}
+
+
+@override_settings(MOVIES_API_CACHE=CACHE_SETTINGS)
+class InvalidateTest(TestCase):
+
+    def setUp(self):
+        caches['movies_api'].clear()
+        self.film = Filmwork.objects.create(title='Movie',
+                                            type=Filmwork.Types.MOVIE)
+
+    def detail_key(self) -> str:
+        return cache.detail_key(self.film.pk, WATERMARK)
+
+    def test_save_film(self):
+        detail_key = self.detail_key()
+        list_version = cache.get_version(cache.LIST_VERSION_KEY)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.film.title = 'Renamed'
+            self.film.save()
+
+        self.assertNotEqual(self.detail_key(), detail_key)
+        self.assertNotEqual(cache.get_version(cache.LIST_VERSION_KEY),
+                            list_version)
+
+    def test_add_genre(self):
+        genre = Genre.objects.create(name='Drama')
+        detail_key = self.detail_key()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.film.genres.add(genre)
+
+        self.assertNotEqual(self.detail_key(), detail_key)
+
+    def test_rename_genre(self):
+        genre = Genre.objects.create(name='Drama')
+        self.film.genres.add(genre)
+        detail_key = self.detail_key()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            genre.name = 'Comedy'
+            genre.save()
+
+        self.assertNotEqual(self.detail_key(), detail_key)
+
+    def test_bump_waits_for_commit(self):
+        detail_key = self.detail_key()
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.film.save()
+
+        self.assertEqual(self.detail_key(), detail_key)
+        self.assertEqual(len(callbacks), 1)
+
+
+@override_settings(MOVIES_API_CACHE=CACHE_SETTINGS,
+                   MOVIES_API_ELASTICSEARCH=True)
+class SearchLagTest(SimpleTestCase):
+
+    def setUp(self):
+        caches['movies_api'].clear()
+        self.built = 0
+        self.now = timezone.now()
+        patches = [
+            mock.patch.object(MoviesListApi, 'get_context_data',
+                              self.get_context_data),
+            mock.patch.object(MoviesListApi, 'get_queryset', list),
+            mock.patch.object(cache, 'get_version', return_value=1),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def get_context_data(self, **kwargs):
+        self.built += 1
+        return {'built': self.built}
+
+    def request(self, age: float):
+        watermark = self.now - datetime.timedelta(seconds=age)
+        with mock.patch.object(MoviesListApi, 'get_watermark',
+                               return_value=watermark):
+            return MoviesListApi.as_view()(RequestFactory().get('/'))
+
+    def test_fresh_change_is_not_cached(self):
+        first = self.request(age=1)
+        second = self.request(age=1)
+
+        self.assertEqual(self.built, 2)
+        self.assertFalse(first.has_header('ETag'))
+        self.assertFalse(second.has_header('ETag'))
+
+    def test_settled_change_is_cached(self):
+        self.request(age=3600)
+        response = self.request(age=3600)
+
+        self.assertEqual(self.built, 1)
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_new_watermark_is_not_served_from_cache(self):
+        # изменение, не замеченное сигналами, все равно меняет ключ
+        first = self.request(age=7200)
+        second = self.request(age=3600)
+
+        self.assertEqual(self.built, 2)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertEqual(second.content, b'{"built": 2}')
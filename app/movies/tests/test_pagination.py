@@ -0,0 +1,114 @@
+import base64
+import json
+import uuid
+
+from django.http import Http404
+from django.test import SimpleTestCase
+
+from movies.pagination import decode_cursor, encode_cursor, paginate_keyset
+
+
+ROWS = [{'title': f'Movie {i:02}', 'id': uuid.UUID(int=i)}
+        for i in range(1, 8)]
+"""Строки выдачи, упорядоченные по (title, id)."""
+
+
+def fetch(position, backward, limit):
+    """Выбрать строки ROWS после позиции или перед ней."""
+    if position is None:
+        rows = ROWS
+    else:
+        key = tuple(position)
+        rows = [row for row in ROWS
+                if ((row['title'], str(row['id'])) < key if backward
+                    else (row['title'], str(row['id'])) > key)]
+    if backward:
+        rows = rows[::-1]
+    return rows[:limit]
+
+
+def token(*data) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode()
+
+
+class DecodeCursorTest(SimpleTestCase):
+
+    def test_round_trip(self):
+        row = ROWS[2]
+        self.assertEqual(decode_cursor(encode_cursor('prev', row)),
+                         ('prev', [row['title'], str(row['id'])]))
+
+    def test_empty(self):
+        self.assertEqual(decode_cursor(''), ('next', None))
+
+    def test_invalid(self):
+        id = str(uuid.uuid4())
+        tokens = [
+            'not base64!',
+            token('next', 't'),
+            token('next', 't', 123),
+            token('next', 't', 'not uuid'),
+            token('next', ['t'], id),
+            token('up', 't', id),
+            base64.urlsafe_b64encode(b'{}').decode(),
+        ]
+        for value in tokens:
+            with self.subTest(token=value):
+                with self.assertRaises(Http404):
+                    decode_cursor(value)
+
+
+class PaginateKeysetTest(SimpleTestCase):
+
+    def page(self, token, size=3):
+        return paginate_keyset(fetch, token, size)
+
+    def titles(self, page):
+        return [row['title'] for row in page['results']]
+
+    def test_first_page(self):
+        page = self.page('')
+        self.assertEqual(self.titles(page),
+                         ['Movie 01', 'Movie 02', 'Movie 03'])
+        self.assertIsNone(page['prev'])
+        self.assertIsNotNone(page['next'])
+
+    def test_forward(self):
+        page = self.page(self.page('')['next'])
+        self.assertEqual(self.titles(page),
+                         ['Movie 04', 'Movie 05', 'Movie 06'])
+        self.assertIsNotNone(page['prev'])
+        self.assertIsNotNone(page['next'])
+
+    def test_last_page(self):
+        page = self.page('')
+        page = self.page(self.page(page['next'])['next'])
+        self.assertEqual(self.titles(page), ['Movie 07'])
+        self.assertIsNotNone(page['prev'])
+        self.assertIsNone(page['next'])
+
+    def test_backward(self):
+        second = self.page(self.page('')['next'])
+        page = self.page(second['prev'])
+        self.assertEqual(self.titles(page),
+                         ['Movie 01', 'Movie 02', 'Movie 03'])
+        self.assertIsNone(page['prev'])
+        self.assertEqual(page['next'], self.page('')['next'])
+
+    def test_backward_from_last_page(self):
+        last = self.page(self.page(self.page('')['next'])['next'])
+        page = self.page(last['prev'])
+        self.assertEqual(self.titles(page),
+                         ['Movie 04', 'Movie 05', 'Movie 06'])
+        self.assertIsNotNone(page['prev'])
+        self.assertIsNotNone(page['next'])
+
+    def test_exact_fit(self):
+        page = self.page('', size=len(ROWS))
+        self.assertEqual(len(page['results']), len(ROWS))
+        self.assertIsNone(page['prev'])
+        self.assertIsNone(page['next'])
+
+    def test_past_the_end(self):
+        page = self.page(encode_cursor('next', ROWS[-1]))
+        self.assertEqual(page, {'prev': None, 'next': None, 'results': []})
@@ -0,0 +1,62 @@
+import threading
+
+from django.db import connection, connections, transaction
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+
+from movies.models import Filmwork
+from movies.watermarks import get_list_watermark
+
+
+@override_settings(MOVIES_API_WATERMARK_SETTLE=0.0)
+class ListWatermarkTest(TransactionTestCase):
+
+    def setUp(self):
+        self.films = [
+            Filmwork.objects.create(title=title, type=Filmwork.Types.MOVIE)
+            for title in ('First', 'Second')
+        ]
+
+    def rename(self, film: Filmwork, title: str):
+        film.title = title
+        film.save()
+
+    def test_concurrent_writers_do_not_wait(self):
+        before = get_list_watermark()
+        renamed = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def hold_transaction():
+            try:
+                with transaction.atomic():
+                    self.rename(self.films[0], 'First renamed')
+                    renamed.set()
+                    release.wait(10)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                renamed.set()
+                connections.close_all()
+
+        thread = threading.Thread(target=hold_transaction)
+        thread.start()
+        try:
+            self.assertTrue(renamed.wait(10))
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '1s';")
+                self.rename(self.films[1], 'Second renamed')
+            committed = get_list_watermark()
+        finally:
+            release.set()
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreater(committed, before)
+        self.assertGreater(get_list_watermark(), committed)
+
+    def test_unsettled_change_has_no_watermark(self):
+        with override_settings(MOVIES_API_WATERMARK_SETTLE=60.0):
+            self.rename(self.films[0], 'Renamed')
+            self.assertIsNone(get_list_watermark())
@@ -0,0 +1,49 @@
+import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+from movies.models import FilmworkDocument
+
+
+WatermarkType = Optional[datetime.datetime]
+"""Момент последнего изменения данных ответа, None - данных нет
+или момент еще не устоялся."""
+
+
+def get_list_watermark() -> WatermarkType:
+    """Получить момент последнего изменения списка Кинопроизведений.
+
+    Каждая транзакция, изменившая film_work_document, пишет момент
+    изменения в журнал непосредственно перед фиксацией. Запись,
+    сделанная позднее MOVIES_API_WATERMARK_SETTLE секунд назад, может
+    принадлежать еще не зафиксированной транзакции, а более ранняя
+    невидимая запись - нет, поэтому пока последняя запись моложе
+    запаса, момент не определен.
+
+    Returns:
+        Момент изменения или None, если он еще не устоялся.
+
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT changed_at, '
+            "changed_at <= clock_timestamp() - %s * interval '1 second' "
+            'FROM content.film_work_document_changes '
+            'ORDER BY changed_at DESC LIMIT 1;',
+            (settings.MOVIES_API_WATERMARK_SETTLE,)
+        )
+        row = cursor.fetchone()
+    if row is None or not row[1]:
+        return None
+    return row[0]
+
+
+def get_film_watermark(pk) -> WatermarkType:
+    """Получить момент последнего изменения Кинопроизведения
+    или его жанров, персон и связей с ними."""
+    return (FilmworkDocument.objects
+            .filter(pk=pk)
+            .values_list('refreshed_at', flat=True)
+            .first())
@@ -19,14 +19,76 @@ POSTGRES_DSN = {
 ROWS_LIMIT = int(os.environ.get('ROWS_LIMIT', 100))
 """Кол-во строк для извлечения за раз."""
 
+SERVER_SIDE_CURSOR = os.environ.get('SERVER_SIDE_CURSOR', 'True') == 'True'
+"""Извлекать полные выгрузки (stream) именованным (серверным) курсором."""
+
+FETCH_SIZE = int(os.environ.get('FETCH_SIZE', 1000))
+"""Кол-во строк, передаваемых серверным курсором за один fetchmany."""
+
+TRANSFORM_VALIDATE_EVERY = int(os.environ.get('TRANSFORM_VALIDATE_EVERY',
+                                              100))
+"""Проверять моделью pydantic каждую N-ю строку Postgres,
+1 - каждую строку, 0 - не проверять."""
+
+DIGEST_CACHE_SIZE = int(os.environ.get('DIGEST_CACHE_SIZE', 100000))
+"""Кол-во хэшей документов, хранимых для каждого индекса, чтобы не
+загружать неизмененные документы, 0 - загружать все."""
+
+INITIAL_LOAD_WORKERS = int(os.environ.get('INITIAL_LOAD_WORKERS', 1))
+"""Кол-во процессов начальной загрузки пустого состояния,
+1 - загружать инкрементальным ETL. Загрузка блокирует запуск
+инкрементальных ETL всех индексов, поэтому включается явно."""
+
 ES = {
     'HOST': os.environ.get('ES_HOST', '127.0.0.1'),
     'PORT': os.environ.get('ES_PORT', 9200),
     'MOVIES_INDEX': os.environ.get('MOVIES_INDEX', 'movies'),
-    'GENRE_INDEX': os.environ.get('GENRE_INDEX', 'genres')
+    'GENRE_INDEX': os.environ.get('GENRE_INDEX', 'genres'),
+    'POOL_SIZE': int(os.environ.get('ES_POOL_SIZE', 10)),
+    'HTTP_COMPRESS': os.environ.get('ES_HTTP_COMPRESS', 'False') == 'True',
+    'REQUEST_TIMEOUT': float(os.environ.get('ES_REQUEST_TIMEOUT', 30.0))
 }
 """Настройки подключения к Elasticsearch."""
 
+MOVIES_PARTIAL_UPDATES = (
+    os.environ.get('MOVIES_PARTIAL_UPDATES', 'False') == 'True'
+)
+"""Переименования жанров и персон применять к индексу movies
+частичным обновлением, а не пересборкой документов."""
+
+MOVIES_READ_MODEL = os.environ.get('MOVIES_READ_MODEL', 'True') == 'True'
+"""Читать Кинопроизведения из таблицы film_work_document, которую
+поддерживают триггеры Postgres, а не собирать их группировкой."""
+
+RECONCILE_SECONDS = float(os.environ.get('RECONCILE_SECONDS', 3600.0))
+"""Как часто сверять id Postgres и Elasticsearch, 0 - не сверять."""
+
+RECONCILE_CHUNK = int(os.environ.get('RECONCILE_CHUNK', 1000))
+"""Кол-во id Postgres, сверяемых за один проход ETL."""
+
+TOMBSTONE_RETENTION_SECONDS = float(
+    os.environ.get('TOMBSTONE_RETENTION_SECONDS', 86400.0)
+)
+"""Сколько секунд хранить записи об удалении, уже прочитанные всеми ETL."""
+
+TOMBSTONE_SETTLE_SECONDS = float(
+    os.environ.get('TOMBSTONE_SETTLE_SECONDS', 10.0)
+)
+"""Через сколько секунд после удаления читать запись о нем: транзакция,
+удалившая строку, должна успеть зафиксироваться до сдвига курсора."""
+
+BULK = {
+    'CHUNK_SIZE': int(os.environ.get('BULK_CHUNK_SIZE', 500)),
+    'MAX_CHUNK_BYTES': int(os.environ.get('BULK_MAX_CHUNK_BYTES',
+                                          10 * 1024 * 1024)),
+    'THREAD_COUNT': int(os.environ.get('BULK_THREAD_COUNT', 4)),
+    'QUEUE_SIZE': int(os.environ.get('BULK_QUEUE_SIZE', 4)),
+    'MAX_RETRIES': int(os.environ.get('BULK_MAX_RETRIES', 3)),
+    'EXTERNAL_VERSIONS': os.environ.get('BULK_EXTERNAL_VERSIONS',
+                                        'True') == 'True'
+}
+"""Настройки параллельной загрузки в Elasticsearch."""
+
 REDIS_DSN = {
     'host': os.environ.get('REDIS_HOST', '127.0.0.1'),
     'port': os.environ.get('REDIS_PORT', 6379),
@@ -34,7 +96,47 @@ REDIS_DSN = {
 }
 """Настройки подключения к Redis."""
 
+STATE_KEY = os.environ.get('STATE_KEY', 'etl:state')
+"""Ключ хэша Redis, в котором хранится состояние ETL."""
+
+STATE_STORAGE = os.environ.get('STATE_STORAGE', 'redis')
+"""Хранилище состояния ETL: redis, file - JSON-файл, sqlite - БД SQLite."""
+
+STATE_FILE_PATH = os.environ.get('STATE_FILE_PATH', 'etl_state.json')
+"""Путь к JSON-файлу состояния для STATE_STORAGE=file."""
+
+STATE_SQLITE_PATH = os.environ.get('STATE_SQLITE_PATH', 'etl_state.sqlite3')
+"""Путь к БД SQLite состояния для STATE_STORAGE=sqlite."""
+
 SLEEP_SECONDS = float(os.environ.get('SLEEP_SECONDS', 1.0))
 """Через сколько секунд заново опрашивать Postgres."""
 
+SLEEP_SECONDS_BY_INDEX = {
+    index: float(os.environ.get(f'{index.upper()}_SLEEP_SECONDS',
+                                SLEEP_SECONDS))
+    for index in ('movies', 'genres', 'persons')
+}
+"""Частота опроса Postgres для каждого индекса."""
+
+IDLE_SLEEP_MAX_SECONDS = float(os.environ.get('IDLE_SLEEP_MAX_SECONDS', 30.0))
+"""Макс. пауза между опросами Postgres, когда новых данных нет."""
+
+CHANGE_CAPTURE = os.environ.get('CHANGE_CAPTURE', 'poll')
+"""Способ обнаружения изменений: poll - опрос Postgres,
+notify - уведомления LISTEN/NOTIFY с опросом как запасным вариантом."""
+
+NOTIFY_CHANNEL = 'content_changes'
+"""Канал уведомлений, в который пишут триггеры таблиц content.
+Задан в миграции 0003_change_notify_triggers и не настраивается."""
+
+NOTIFY_FALLBACK_SECONDS = float(os.environ.get('NOTIFY_FALLBACK_SECONDS',
+                                               60.0))
+"""Макс. пауза между опросами Postgres в режиме notify."""
+
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+"""Адрес HTTP-сервера метрик Prometheus."""
+
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 8000))
+"""Порт HTTP-сервера метрик Prometheus, 0 - не запускать."""
+
 BACKOFF_MAX_TIME = float(os.environ.get('BACKOFF_MAX_TIME', 10.0))
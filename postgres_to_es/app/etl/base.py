@@ -1,57 +1,195 @@
 from abc import abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import ClassVar, Iterable, Iterator, Optional
 import logging
 import datetime
+import time
+import uuid
 
 from pydantic import BaseModel
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
 from elastic_transport import ConnectionError
 from psycopg2._psycopg import connection
 import backoff
 
-from app import config
+from app import config, metrics
 from app.state import State
+from app.listener import ChangeFeed
+from app.etl.bulk import BulkEngine, BulkLoadError, BulkStats
+from app.etl.digests import DigestCache
 
 
-def transform(rows: list, target_model: BaseModel) -> list[BaseModel]:
-    """Трансформировать данные из формата Postgres в ES.
+Cursor = tuple
+"""Позиция keyset-курсора: дата-время изменения, id строки
+и, для связанных таблиц, id Кинопроизведения."""
+
+CURSOR_SUFFIXES = ('', '_id', '_film_id')
+"""Суффиксы ключей состояния для каждой части курсора."""
+
+MIN_ID = '00000000-0000-0000-0000-000000000000'
+"""Минимальный id для курсора, сохраненного без id."""
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+"""Начало отсчета версий документов."""
+
+
+def to_version(moment: datetime.datetime) -> int:
+    """Получить внешнюю версию документа из даты-времени изменения.
+
+    Args:
+        moment: Дата-время последнего изменения исходных строк
+
+    Returns:
+        int: Кол-во микросекунд с начала эпохи
+
+    """
+    return (moment - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def deduplicate(changes: dict[str, list]) -> tuple[dict[str, list], int]:
+    """Объединить id из нескольких потоков изменений без повторов.
+
+    Args:
+        changes: Списки id, измененных по каждому потоку
+
+    Returns:
+        tuple[dict[str, list], int]: Словарь id с потоками, вызвавшими
+                                     изменение, и кол-во удаленных повторов
+
+    """
+    sources = {}
+    total = 0
+    for stream, ids in changes.items():
+        for id in ids:
+            total += 1
+            sources.setdefault(str(id), []).append(stream)
+    return (sources, total - len(sources))
+
+
+def transform(rows: list, target_model: type[BaseModel],
+              validate_every: int = config.TRANSFORM_VALIDATE_EVERY
+              ) -> list[dict]:
+    """Трансформировать данные из формата Postgres в документы ES.
+
+    Столбцы запросов названы как поля модели, поэтому документ
+    собирается из строки напрямую, без построения моделей pydantic.
+    Модель проверяет каждую validate_every-ю строку, чтобы расхождение
+    запроса и схемы не прошло незамеченным.
 
     Args:
         rows: Данные из Postgres
+        target_model: Модель документа
+        validate_every: Проверять моделью каждую N-ю строку,
+                        1 - собирать все документы через модель,
+                        0 - не проверять
 
     Returns:
-        list[BaseModel]: Данные для ES
+        list[dict]: Документы для ES
+
+    Raises:
+        ValidationError: Если проверенная строка не соответствует модели
 
     """
-    return [target_model(**row) for row in rows]
+    if validate_every == 1:
+        return [target_model(**row).dict() for row in rows]
+    if validate_every:
+        for row in rows[::validate_every]:
+            target_model(**row)
+    fields = list(target_model.__fields__)
+    return [{name: row[name] for name in fields} for row in rows]
 
 
 @backoff.on_exception(backoff.expo,
                       ConnectionError,
                       max_time=config.BACKOFF_MAX_TIME)
-def load(rows: list[BaseModel], index_name: str):
+def load(es: Elasticsearch, rows: list[dict], index_name: str,
+         deleted_ids: Iterable[str] = (),
+         versions: Optional[dict[str, int]] = None,
+         metrics_index: Optional[str] = None) -> dict[str, BulkStats]:
     """Загрузить данные в ElasticSearch.
 
+    Если переданы версии, документы записываются с внешней версией,
+    и Elasticsearch не дает более старому батчу затереть более новый
+    документ. Такие отказы считаются успешной загрузкой.
+
     Args:
-        rows: Данные в подготовленном формате
+        es: Клиент Elasticsearch
+        rows: Документы для ES
         index_name: Название индекса
+        deleted_ids: id документов, которые нужно удалить из индекса
+        versions: Версии документов по id
+        metrics_index: Индекс в метриках батча, None - не записывать
+
+    Returns:
+        dict[str, BulkStats]: Результат загрузки по каждому индексу
+
+    Raises:
+        BulkLoadError: Если Elasticsearch подтвердил не все документы
 
     """
-    def es_init():
-        """Инициализировать Elasticsearch."""
-        host = config.ES['HOST']
-        port = config.ES['PORT']
-        return Elasticsearch(f"http://{host}:{port}")
-
-    with es_init() as es:
-        body = [{'_index': index_name,
-                 '_id': row.id,
-                 '_source': row.dict()}
-                for row in rows]
-        if body:
-            bulk(es, body)
-            logging.info(f'Было обновлено {len(rows)} записей')
+    def index_action(row: dict) -> dict:
+        """Собрать действие записи документа."""
+        id = str(row['id'])
+        action = {'_index': index_name, '_id': id, '_source': row}
+        if versions:
+            action['_version'] = versions[id]
+            action['_version_type'] = 'external'
+        return action
+
+    actions = chain(
+        (index_action(row) for row in rows),
+        ({'_op_type': 'delete',
+          '_index': index_name,
+          '_id': id}
+         for id in deleted_ids)
+    )
+    engine = BulkEngine(es)
+    stats = engine.load(actions)
+    for index, index_stats in stats.items():
+        logging.info(f'Было обновлено {index_stats.success} записей '
+                     f'в {index}, ошибок: {index_stats.failed}')
+        if index_stats.conflicts:
+            logging.info(f'Из них {index_stats.conflicts} уже были в {index} '
+                         f'в той же или более новой версии')
+    if metrics_index:
+        metrics.BATCH_BYTES.labels(metrics_index).observe(engine.sent_bytes)
+    if engine.sent_bytes:
+        logging.info(f'Отправлено {engine.sent_bytes} байт NDJSON, '
+                     f'кодирование {engine.encode_seconds * 1000:.1f} мс')
+    if any(index_stats.failed for index_stats in stats.values()):
+        raise BulkLoadError('Не все документы загружены в Elasticsearch')
+    return stats
+
+
+def scan_ids(es: Elasticsearch, index_name: str, after: str,
+             upper: Optional[str]) -> Iterator[str]:
+    """Получить отсортированные id документов индекса из диапазона.
+
+    Args:
+        es: Клиент Elasticsearch
+        index_name: Название индекса
+        after: Нижняя граница, не включая
+        upper: Верхняя граница включительно, None - без границы
+
+    """
+    id_range = {'gt': after}
+    if upper:
+        id_range['lte'] = upper
+    search_after = None
+    while True:
+        resp = es.search(index=index_name,
+                         query={'range': {'id': id_range}},
+                         sort=[{'id': 'asc'}],
+                         source=False,
+                         size=config.RECONCILE_CHUNK,
+                         search_after=search_after)
+        hits = resp['hits']['hits']
+        for hit in hits:
+            yield hit['_id']
+        if len(hits) < config.RECONCILE_CHUNK:
+            return
+        search_after = hits[-1]['sort']
 
 
 @dataclass
@@ -67,20 +205,268 @@ class Extractor():
     connection: connection
     rows_limit: int
     state: State
+    has_more: bool = field(default=False, init=False)
+    """Хотя бы один запрос вернул полный батч."""
+    duplicates: int = field(default=0, init=False)
+    """Кол-во повторов, удаленных при объединении потоков изменений."""
+    pushed_ids: list = field(default_factory=list)
+    """id, переданные уведомлениями об изменениях."""
+    deleted_ids: list = field(default_factory=list, init=False)
+    """id документов, которые нужно удалить из индекса."""
+    changed_at: dict = field(default_factory=dict, init=False)
+    """Время удаления связей по id документа, которое не видно
+    в столбце version_at."""
+
+    ID_SOURCE_SQL: ClassVar[str] = ''
+    """Запрос id всех строк, которые должны быть в индексе."""
+
+    FULL_SQL: ClassVar[str] = ''
+    """Запрос всех документов индекса для полной загрузки."""
+
+    STATE_KEYS: ClassVar[tuple] = ()
+    """Ключи состояния потоков изменений индекса."""
+
+    def get_cursor(self, key: str, size: int = 2) -> Optional[Cursor]:
+        """Получить сохраненную позицию keyset-курсора.
+
+        Args:
+            key: Ключ состояния
+            size: Кол-во частей курсора
+
+        Returns:
+            Optional[Cursor]: Дата-время изменения и id последней строки
+
+        """
+        updated_at = self.state.get_state(key)
+        if not updated_at:
+            return None
+        ids = (self.state.get_state(f'{key}{suffix}') or MIN_ID
+               for suffix in CURSOR_SUFFIXES[1:size])
+        return (updated_at, *ids)
+
+    def get_keyset(self, key: str, columns: str,
+                   clause: str = 'WHERE') -> tuple[str, tuple]:
+        """Получить условие keyset-пагинации для запроса.
+
+        Args:
+            key: Ключ состояния
+            columns: Столбцы курсора в формате SQL,
+                     начиная с даты-времени изменения
+            clause: Инструкция, в которую встраивается условие
+
+        Returns:
+            tuple[str, tuple]: Условие и его параметры
+
+        """
+        size = len(columns.split(','))
+        cursor = self.get_cursor(key, size)
+        if cursor:
+            placeholders = ', '.join(['%s'] * size)
+            return (f'{clause} ({columns}) > ({placeholders})', cursor)
+        return ('', ())
+
+    def fetch(self, sql: str, params: tuple = (),
+              server_side: bool = False) -> Iterator[list]:
+        """Извлекать данные из Postgres.
+
+        Именованный (серверный) курсор отдает данные порциями по
+        FETCH_SIZE строк и нужен только для неограниченных выборок:
+        для запросов с LIMIT или списком id лишние DECLARE и FETCH
+        дороже одного fetchall.
+
+        Args:
+            sql: SQL-запрос
+            params: Параметры запроса
+            server_side: Извлекать именованным курсором
+
+        """
+        if not server_side:
+            with self.connection.cursor() as curs:
+                curs.execute(sql, params)
+                yield curs.fetchall()
+            return
+
+        name = f'etl_{uuid.uuid4().hex}'
+        with self.connection.cursor(name=name) as curs:
+            curs.itersize = config.FETCH_SIZE
+            curs.execute(sql, params)
+            while rows := curs.fetchmany(config.FETCH_SIZE):
+                yield rows
+
+    def stream(self, after: Optional[str] = None,
+               upper: Optional[str] = None) -> Iterator[list]:
+        """Извлекать документы индекса порциями по FETCH_SIZE строк
+        одним запросом серверного курсора.
+
+        Если задан диапазон id, документы извлекаются по возрастанию id.
+
+        Args:
+            after: Нижняя граница id, не включая
+            upper: Верхняя граница id включительно, None - без границы
+
+        """
+        if after is None:
+            return self.fetch(self.FULL_SQL,
+                              server_side=config.SERVER_SIDE_CURSOR)
+
+        where, params = 'WHERE s.id > %s', (after,)
+        if upper:
+            where += ' AND s.id <= %s'
+            params += (upper,)
+        sql = f"""
+            SELECT * FROM ({self.FULL_SQL}) s
+            {where}
+            ORDER BY s.id;
+        """
+        return self.fetch(sql, params, server_side=config.SERVER_SIDE_CURSOR)
+
+    def get_versions(self, rows: list) -> Optional[dict[str, int]]:
+        """Получить внешние версии документов.
+
+        Версия - последнее изменение исходных строк документа
+        (столбец version_at) или удаления его связей.
+
+        Args:
+            rows: Данные из Postgres
+
+        Returns:
+            Optional[dict[str, int]]: Версии по id или None,
+                                      если внешние версии отключены
+
+        """
+        if not config.BULK['EXTERNAL_VERSIONS']:
+            return None
+        versions = {}
+        for row in rows:
+            id = str(row['id'])
+            moment = row['version_at']
+            if id in self.changed_at:
+                moment = max(moment, self.changed_at[id])
+            versions[id] = to_version(moment)
+        return versions
+
+    def touch(self, id: str, moment: datetime.datetime):
+        """Учесть в версии документа удаление его связи.
+
+        Args:
+            id: id документа
+            moment: Дата-время удаления
+
+        """
+        if id not in self.changed_at or self.changed_at[id] < moment:
+            self.changed_at[id] = moment
 
-    def execute_sql(self, sql: str) -> tuple[list, datetime.datetime]:
-        """Получить данные из Postgres и дату-время последнего изменения.
+    def execute_sql(self, sql: str, params: tuple = (),
+                    cursor_columns: tuple = ('updated_at', 'id')
+                    ) -> tuple[list, Optional[Cursor]]:
+        """Получить данные из Postgres и позицию курсора последней строки.
 
         Args:
             sql: SQL-запрос
+            params: Параметры запроса
+            cursor_columns: Столбцы результата, образующие курсор
+
+        """
+        data = [row for rows in self.fetch(sql, params) for row in rows]
+        if len(data) >= self.rows_limit:
+            self.has_more = True
+        last_cursor = (
+            tuple(data[-1][column] for column in cursor_columns)
+            if data else None
+        )
+        return (data, last_cursor)
+
+    def get_tombstones(self, key: str,
+                       tables: list[str]) -> tuple[list, Optional[Cursor]]:
+        """Получить записи об удаленных строках и позицию курсора.
+
+        Записи моложе TOMBSTONE_SETTLE_SECONDS откладываются: запись
+        незафиксированной транзакции с меньшим deleted_at иначе
+        осталась бы позади курсора.
+
+        Args:
+            key: Ключ состояния
+            tables: Таблицы, удаления из которых затрагивают индекс
+
+        """
+        where, params = self.get_keyset(key, 'd.deleted_at, d.id',
+                                        clause='AND')
+        sql = f"""
+            SELECT
+                d.id,
+                d.deleted_at as updated_at,
+                d.table_name,
+                d.entity_id::text,
+                d.film_work_id::text,
+                d.person_id::text
+            FROM
+                content.deleted_entities d
+            WHERE
+                d.table_name = ANY(%s)
+                AND d.deleted_at < now() - %s * interval '1 second'
+                {where}
+            ORDER BY
+                d.deleted_at, d.id
+            LIMIT {self.rows_limit};
+        """
+        return self.execute_sql(
+            sql, (tables, config.TOMBSTONE_SETTLE_SECONDS, *params)
+        )
+
+    def prune_tombstones(self, cursors: list[str]) -> int:
+        """Удалить записи об удалении, прочитанные всеми ETL
+        и старше TOMBSTONE_RETENTION_SECONDS.
+
+        Args:
+            cursors: Дата-время позиций курсоров записей об удалении
+                     всех индексов
 
+        Returns:
+            int: Кол-во удаленных записей
+
+        """
+        sql = """
+            DELETE FROM content.deleted_entities
+            WHERE deleted_at < LEAST(
+                now() - %s * interval '1 second',
+                (SELECT MIN(c) FROM unnest(%s::timestamptz[]) c)
+            );
         """
         with self.connection.cursor() as curs:
-            curs.execute(sql)
-            data = curs.fetchall()
+            curs.execute(sql, (config.TOMBSTONE_RETENTION_SECONDS, cursors))
+            count = curs.rowcount
+        self.connection.commit()
+        return count
+
+    def get_ids(self, after: str, limit: int) -> list[str]:
+        """Получить отсортированные id строк, которые должны быть в индексе.
+
+        Args:
+            after: Нижняя граница, не включая
+            limit: Макс. кол-во id
+
+        """
+        sql = f"""
+            SELECT s.id::text FROM ({self.ID_SOURCE_SQL}) s
+            WHERE s.id > %s
+            ORDER BY s.id
+            LIMIT %s;
+        """
+        return [row[0] for rows in self.fetch(sql, (after, limit))
+                for row in rows]
 
-            last_updated_at = data[-1]['updated_at'] if data else None
-            return (data, last_updated_at)
+    def get_existing(self, ids: list[str]) -> set[str]:
+        """Получить id из списка, которые должны быть в индексе.
+
+        Args:
+            ids: Проверяемые id
+
+        """
+        sql = f"""
+            SELECT s.id::text FROM ({self.ID_SOURCE_SQL}) s
+            WHERE s.id = ANY(%s::uuid[]);
+        """
+        return {row[0] for rows in self.fetch(sql, (ids,)) for row in rows}
 
     @abstractmethod
     def get(self) -> tuple[list, dict]:
@@ -88,12 +474,51 @@ class Extractor():
 
         Returns:
             tuple[list[Any], dict]: Список кинопроизведений и словарь
-                                    с датой-временем последнего изменения
-                                    каждой таблицы
+                                    с позицией курсора каждой таблицы
         """
         pass
 
 
+@dataclass
+class EtlResult:
+    """Результат одного прохода ETL.
+
+    Args:
+        rows: Кол-во извлеченных строк
+        has_more: В Postgres остались необработанные строки
+        lag: Отставание индекса от Postgres в секундах
+        duplicates: Кол-во повторных записей, не отправленных в ES
+        deleted: Кол-во удаленных из индекса документов
+        skipped: Кол-во неизмененных документов, не отправленных в ES
+
+    """
+    rows: int
+    has_more: bool
+    lag: float
+    duplicates: int = 0
+    deleted: int = 0
+    skipped: int = 0
+
+
+def get_lag(state: dict, has_more: bool) -> float:
+    """Получить отставание индекса от Postgres.
+
+    Args:
+        state: Словарь с позицией курсора каждой таблицы
+        has_more: В Postgres остались необработанные строки
+
+    Returns:
+        float: Сколько секунд прошло с изменения самой старой
+               необработанной строки, либо 0, если ETL догнал Postgres
+
+    """
+    updated = [cursor[0] for cursor in state.values() if cursor]
+    if not has_more or not updated:
+        return 0.0
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return max((now - min(updated)).total_seconds(), 0.0)
+
+
 @dataclass
 class Etl():
     """Основной ETL-класс.
@@ -104,6 +529,8 @@ class Etl():
         state: Класс для хранения состояния
         model: Модель для сохранения данных
         index_name: Название индекса
+        es: Клиент Elasticsearch
+        changes: Уведомления об изменениях для индекса
 
     """
     connection: connection
@@ -112,17 +539,165 @@ class Etl():
     extractor_class: Extractor
     model: BaseModel
     index_name: str
+    es: Elasticsearch
+    changes: Optional[ChangeFeed] = None
+    next_reconcile_at: float = field(default=0.0, init=False)
+    """Когда начать следующую сверку id Postgres и ES."""
+    digests: DigestCache = field(default_factory=DigestCache, init=False)
+    """Хэши документов, уже загруженных в индекс."""
+    metrics_name: Optional[str] = field(default=None, init=False)
+    """Название индекса в метриках, None - index_name. При переиндексации
+    это псевдоним, чтобы версионированные индексы не плодили серии."""
 
-    def etl(self):
-        """Извлечь, трансформировать и загрузить Жанры."""
+    @property
+    def metrics_label(self) -> str:
+        """Название индекса в метриках."""
+        return self.metrics_name or self.index_name
+
+    def etl(self) -> EtlResult:
+        """Извлечь, трансформировать и загрузить данные.
+
+        Returns:
+            EtlResult: Результат прохода
+
+        """
+        pushed_ids = self.changes.drain() if self.changes else []
         extractor = self.extractor_class(connection=self.connection,
                                          rows_limit=self.rows_limit,
-                                         state=self.state)
+                                         state=self.state,
+                                         pushed_ids=pushed_ids)
 
-        rows, state = extractor.get()
-        rows = transform(rows, self.model)
-        load(rows, self.index_name)
-        self.save_state(state)
+        stage = metrics.STAGE_SECONDS
+        try:
+            with stage.labels(self.metrics_label, 'extract').time():
+                rows, state = extractor.get()
+            count = len(rows)
+            metrics.BATCH_ROWS.labels(self.metrics_label).observe(count)
+            with stage.labels(self.metrics_label, 'transform').time():
+                docs = transform(rows, self.model)
+                changed, digests = self.digests.filter(docs)
+            # load() падает, если хотя бы один документ не подтвержден,
+            # поэтому курсоры сдвигаются только после полной загрузки батча
+            with stage.labels(self.metrics_label, 'load').time():
+                load(self.es, changed, self.index_name,
+                     extractor.deleted_ids, extractor.get_versions(rows),
+                     metrics_index=self.metrics_label)
+                self.after_load(extractor)
+            with stage.labels(self.metrics_label, 'checkpoint').time():
+                self.save_state(state)
+        except Exception:
+            if self.changes:
+                self.changes.push(*pushed_ids)
+            raise
+        metrics.DUPLICATES.labels(self.metrics_label).inc(extractor.duplicates)
+        if extractor.duplicates:
+            logging.info(f'Удалено {extractor.duplicates} повторных '
+                         f'записей для {self.index_name}')
+        self.digests.update(digests)
+        self.digests.discard(extractor.deleted_ids)
+        skipped = len(docs) - len(changed)
+        if skipped:
+            logging.info(f'Пропущено {skipped} неизмененных документов '
+                         f'из {len(docs)} ({skipped / len(docs):.0%}) '
+                         f'для {self.index_name}')
 
-    def save_state(self, state: dict):
+        deleted = len(extractor.deleted_ids)
+        if (config.RECONCILE_SECONDS
+                and time.monotonic() >= self.next_reconcile_at):
+            deleted += self.reconcile(extractor)
+
+        lag = get_lag(state, extractor.has_more)
+        metrics.LAG_SECONDS.labels(self.metrics_label).set(lag)
+        return EtlResult(rows=count,
+                         has_more=extractor.has_more,
+                         lag=lag,
+                         duplicates=extractor.duplicates,
+                         deleted=deleted,
+                         skipped=skipped)
+
+    def reconcile(self, extractor: Extractor) -> int:
+        """Сверить очередную порцию id Postgres и ES и удалить из индекса
+        документы, которых нет в Postgres.
+
+        За проход сверяется не больше RECONCILE_CHUNK id Postgres,
+        позиция сверки хранится в состоянии.
+
+        Args:
+            extractor: Класс извлечения данных текущего прохода
+
+        Returns:
+            int: Кол-во удаленных документов
+
+        """
+        key = f'{self.index_name}_reconcile'
+        after = self.state.get_state(key) or MIN_ID
+        ids = extractor.get_ids(after, config.RECONCILE_CHUNK)
+        is_last = len(ids) < config.RECONCILE_CHUNK
+        upper = None if is_last else ids[-1]
+
+        known = set(ids)
+        candidates = [id for id in scan_ids(self.es, self.index_name,
+                                            after, upper)
+                      if id not in known]
+        # строки могли появиться после чтения порции id
+        stale = []
+        if candidates:
+            existing = extractor.get_existing(candidates)
+            stale = [id for id in candidates if id not in existing]
+        if stale:
+            load(self.es, [], self.index_name, stale)
+            self.digests.discard(stale)
+            logging.info(f'Сверка удалила {len(stale)} документов '
+                         f'из {self.index_name}')
+
+        if is_last:
+            self.prune_tombstones(extractor)
+            self.state.set_state(key, MIN_ID)
+            self.next_reconcile_at = (time.monotonic()
+                                      + config.RECONCILE_SECONDS)
+        else:
+            self.state.set_state(key, upper)
+        return len(stale)
+
+    def prune_tombstones(self, extractor: Extractor):
+        """Удалить записи об удалении, которые уже прочитали ETL всех
+        индексов.
+
+        Позиции курсоров читаются из хранилища, а не из состояния
+        процесса, чтобы учесть курсоры других ETL.
+
+        Args:
+            extractor: Класс извлечения данных текущего прохода
+
+        """
+        saved = self.state.storage.retrieve_state()
+        cursors = [value for key, value in saved.items()
+                   if key.endswith('_deleted') and value]
+        if not cursors:
+            return
+        count = extractor.prune_tombstones(cursors)
+        if count:
+            logging.info(f'Удалено {count} прочитанных записей об удалении')
+
+    def after_load(self, extractor: Extractor):
+        """Выполнить действия после загрузки батча, до сохранения состояния.
+
+        Args:
+            extractor: Класс извлечения данных текущего прохода
+
+        """
         pass
+
+    def save_state(self, state: dict):
+        """Сохранить позиции keyset-курсоров одной транзакцией,
+        чтобы курсоры всех потоков изменений были согласованы.
+
+        Args:
+            state: Словарь с позицией курсора каждой таблицы
+
+        """
+        with self.state.transaction():
+            for key, cursor in state.items():
+                if cursor:
+                    for suffix, value in zip(CURSOR_SUFFIXES, cursor):
+                        self.state.set_state(f'{key}{suffix}', str(value))
@@ -0,0 +1,239 @@
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+import logging
+import time
+
+from elasticsearch import ApiError, Elasticsearch
+import orjson
+
+from app import config
+
+
+@dataclass
+class BulkStats:
+    """Результат загрузки в индекс.
+
+    Args:
+        success: Кол-во подтвержденных документов
+        failed: Кол-во документов с ошибкой
+        conflicts: Кол-во подтвержденных документов, которые не записаны,
+                   потому что в индексе уже есть версия не старше
+
+    """
+    success: int = 0
+    failed: int = 0
+    conflicts: int = 0
+
+
+BulkResult = tuple[dict, bool, dict]
+"""Действие, признак успеха и ответ Elasticsearch на него."""
+
+BulkChunk = tuple[list[dict], bytes]
+"""Действия одного запроса _bulk и его тело в формате NDJSON."""
+
+META_FIELDS = {
+    '_index': '_index',
+    '_id': '_id',
+    '_version': 'version',
+    '_version_type': 'version_type'
+}
+"""Поля действия, переносимые в строку метаданных _bulk."""
+
+
+class BulkLoadError(Exception):
+    """Elasticsearch подтвердил не все документы батча."""
+
+
+def is_retryable(status) -> bool:
+    """Проверить, можно ли повторить действие с таким статусом.
+
+    Args:
+        status: HTTP-статус ответа на действие
+
+    """
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def is_gone(action: dict, info: dict) -> bool:
+    """Проверить, что удаляемого документа уже нет в индексе.
+
+    Args:
+        action: Действие для _bulk
+        info: Ответ Elasticsearch на действие
+
+    """
+    return action.get('_op_type') == 'delete' and info.get('status') == 404
+
+
+def is_stale(action: dict, info: dict) -> bool:
+    """Проверить, что в индексе уже есть версия документа не старше.
+
+    Args:
+        action: Действие для _bulk
+        info: Ответ Elasticsearch на действие
+
+    """
+    return (action.get('_version_type') == 'external'
+            and info.get('status') == 409)
+
+
+def encode(action: dict) -> bytes:
+    """Закодировать действие в строки NDJSON запроса _bulk.
+
+    Args:
+        action: Действие для _bulk
+
+    Returns:
+        bytes: Строка метаданных и, кроме удаления, строка документа
+
+    """
+    op_type = action.get('_op_type', 'index')
+    meta = {name: action[key] for key, name in META_FIELDS.items()
+            if key in action}
+    lines = orjson.dumps({op_type: meta}) + b'\n'
+    if op_type != 'delete':
+        lines += orjson.dumps(action['_source']) + b'\n'
+    return lines
+
+
+@dataclass
+class BulkEngine:
+    """Параллельная загрузка действий в Elasticsearch порциями.
+
+    Запросы _bulk собираются в NDJSON с помощью orjson и передаются
+    клиенту готовыми байтами. Сжатие gzip включается настройкой
+    клиента ES_HTTP_COMPRESS.
+
+    Args:
+        es: Клиент Elasticsearch
+        chunk_size: Макс. кол-во действий в одном запросе _bulk
+        max_chunk_bytes: Макс. размер одного запроса _bulk в байтах
+        thread_count: Кол-во потоков, отправляющих запросы
+        queue_size: Размер очереди порций между потоками
+        max_retries: Кол-во повторов действий, получивших 429 или 5xx
+
+    """
+    es: Elasticsearch
+    chunk_size: int = config.BULK['CHUNK_SIZE']
+    max_chunk_bytes: int = config.BULK['MAX_CHUNK_BYTES']
+    thread_count: int = config.BULK['THREAD_COUNT']
+    queue_size: int = config.BULK['QUEUE_SIZE']
+    max_retries: int = config.BULK['MAX_RETRIES']
+    sent_bytes: int = field(default=0, init=False)
+    """Размер отправленных запросов в байтах."""
+    encode_seconds: float = field(default=0.0, init=False)
+    """Время кодирования действий в NDJSON в секундах."""
+
+    def chunks(self, actions: Iterable[dict]) -> Iterator[BulkChunk]:
+        """Разбить действия на запросы _bulk по chunk_size действий
+        и max_chunk_bytes байт.
+
+        Args:
+            actions: Действия для _bulk
+
+        """
+        chunk, lines, size = [], [], 0
+        for action in actions:
+            start = time.perf_counter()
+            data = encode(action)
+            self.encode_seconds += time.perf_counter() - start
+            if chunk and (len(chunk) >= self.chunk_size
+                          or size + len(data) > self.max_chunk_bytes):
+                yield (chunk, b''.join(lines))
+                chunk, lines, size = [], [], 0
+            chunk.append(action)
+            lines.append(data)
+            size += len(data)
+        if chunk:
+            yield (chunk, b''.join(lines))
+
+    def send_chunk(self, chunk: BulkChunk) -> list[BulkResult]:
+        """Отправить один запрос _bulk.
+
+        Если Elasticsearch отклонил запрос целиком, все его действия
+        получают статус ответа.
+
+        Args:
+            chunk: Действия и тело запроса
+
+        Returns:
+            list[BulkResult]: Результат по каждому действию
+
+        """
+        actions, body = chunk
+        try:
+            resp = self.es.bulk(operations=body)
+        except ApiError as e:
+            info = {'status': e.status_code, 'error': str(e)}
+            return [(action, False, info) for action in actions]
+
+        results = []
+        for action, item in zip(actions, resp['items']):
+            _, info = item.popitem()
+            ok = 200 <= info.get('status', 500) < 300
+            results.append((action, ok, info))
+        return results
+
+    def send(self, actions: Iterable[dict]) -> Iterator[BulkResult]:
+        """Отправить действия и вернуть результат по каждому.
+
+        Тело каждого запроса собирается в NDJSON заранее, запросы
+        отправляются thread_count потоками, в очереди ждут не больше
+        queue_size запросов.
+
+        Args:
+            actions: Действия для _bulk
+
+        Returns:
+            Iterator[BulkResult]: Результат по каждому действию
+
+        """
+        with ThreadPoolExecutor(self.thread_count) as pool:
+            pending = deque()
+            for chunk in self.chunks(actions):
+                self.sent_bytes += len(chunk[1])
+                pending.append(pool.submit(self.send_chunk, chunk))
+                if len(pending) >= self.thread_count + self.queue_size:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+    def load(self, actions: Iterable[dict]) -> dict[str, BulkStats]:
+        """Загрузить действия, повторяя только отклоненные с 429 или 5xx.
+
+        Args:
+            actions: Действия для _bulk
+
+        Returns:
+            dict[str, BulkStats]: Результат загрузки по каждому индексу
+
+        """
+        stats = defaultdict(BulkStats)
+        attempt = 0
+        while True:
+            retry = []
+            for action, ok, info in self.send(actions):
+                index_stats = stats[action['_index']]
+                if ok or is_gone(action, info):
+                    index_stats.success += 1
+                elif is_stale(action, info):
+                    index_stats.success += 1
+                    index_stats.conflicts += 1
+                elif (is_retryable(info.get('status'))
+                        and attempt < self.max_retries):
+                    retry.append(action)
+                else:
+                    index_stats.failed += 1
+                    logging.error('Документ %s не загружен в %s: %s',
+                                  action['_id'], action['_index'],
+                                  info.get('error'))
+            if not retry:
+                return dict(stats)
+
+            attempt += 1
+            logging.warning('Повтор %d для %d документов',
+                            attempt, len(retry))
+            time.sleep(min(2 ** attempt * 0.1, config.BACKOFF_MAX_TIME))
+            actions = retry
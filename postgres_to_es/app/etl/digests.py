@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from typing import Iterable
+
+import orjson
+
+from app import config
+
+
+def digest(doc: dict) -> bytes:
+    """Получить хэш содержимого документа.
+
+    Args:
+        doc: Документ для ES
+
+    """
+    return blake2b(orjson.dumps(doc, option=orjson.OPT_SORT_KEYS),
+                   digest_size=16).digest()
+
+
+@dataclass
+class DigestCache:
+    """LRU-кэш хэшей документов, загруженных в индекс,
+    чтобы не отправлять в ES документы, которые не изменились.
+
+    Args:
+        max_size: Макс. кол-во хранимых хэшей, 0 - кэш отключен
+
+    """
+    max_size: int = config.DIGEST_CACHE_SIZE
+    digests: OrderedDict = field(default_factory=OrderedDict, init=False)
+    """Хэши документов по id, от давно использованных к недавним."""
+
+    def filter(self, docs: list[dict]) -> tuple[list[dict], dict]:
+        """Отобрать документы, которые отличаются от загруженных.
+
+        Args:
+            docs: Документы для ES
+
+        Returns:
+            tuple[list[dict], dict]: Измененные документы и их хэши,
+                                     которые нужно сохранить после загрузки
+
+        """
+        if not self.max_size:
+            return (docs, {})
+        changed, digests = [], {}
+        for doc in docs:
+            id = str(doc['id'])
+            doc_digest = digest(doc)
+            if self.digests.get(id) == doc_digest:
+                self.digests.move_to_end(id)
+                continue
+            changed.append(doc)
+            digests[id] = doc_digest
+        return (changed, digests)
+
+    def update(self, digests: dict):
+        """Запомнить хэши загруженных документов.
+
+        Args:
+            digests: Хэши документов по id
+
+        """
+        if not self.max_size:
+            return
+        for id, doc_digest in digests.items():
+            self.digests[id] = doc_digest
+            self.digests.move_to_end(id)
+        while len(self.digests) > self.max_size:
+            self.digests.popitem(last=False)
+
+    def discard(self, ids: Iterable[str]):
+        """Забыть хэши удаленных документов.
+
+        Args:
+            ids: id документов
+
+        """
+        for id in ids:
+            self.digests.pop(id, None)
+
+    def clear(self):
+        """Забыть все хэши, если документы индекса изменены в обход кэша."""
+        self.digests.clear()
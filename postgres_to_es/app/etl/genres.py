@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import ClassVar
 
 from app import config
 from app.models.genre import Genre
@@ -9,41 +10,53 @@ from app.etl.base import Extractor, Etl
 class GenreExtractor(Extractor):
     """Класс извлечения данных из Postgres."""
 
+    STATE_KEYS: ClassVar[tuple] = ('genre', 'genre_deleted')
+
+    ID_SOURCE_SQL: ClassVar[str] = 'SELECT id FROM content.genre'
+
+    FULL_SQL: ClassVar[str] = (
+        """
+            SELECT
+                g.id,
+                g.name,
+                g.description,
+                g.updated_at,
+                g.updated_at as version_at
+            FROM
+                content.genre g
+        """
+    )
+
     def get(self) -> tuple[list, dict]:
         """Получить измененные жанры.
 
         Returns:
             tuple[list[Any], dict]: Список жанров и словарь
-                                    с датой-временем последнего изменения
-                                    таблицы
+                                    с позицией курсора таблицы
+                                    и записей об удалении
         """
-        def get_where() -> str:
-            """Получить инструкцию WHERE для запроса."""
-            value = self.state.get_state('genre')
-            if value:
-                return f"WHERE g.updated_at > '{value}'"
-            return ''
-
-        where = get_where()
+        where, params = self.get_keyset('genre', 'g.updated_at, g.id')
         sql = f"""
             SELECT
                 g.id,
                 g.name,
                 g.description,
-                g.updated_at
+                g.updated_at,
+                g.updated_at as version_at
             FROM
                 content.genre g
-                JOIN content.genre_film_work gfw ON g.id = gfw.genre_id
             {where}
-            GROUP BY
-                g.id
             ORDER BY
-                g.updated_at
+                g.updated_at, g.id
             LIMIT {self.rows_limit};
         """
-        rows, last_updated = self.execute_sql(sql)
+        rows, last_cursor = self.execute_sql(sql, params)
+        tombstones, last_cursor_deleted = self.get_tombstones('genre_deleted',
+                                                              ['genre'])
+        self.deleted_ids = [row['entity_id'] for row in tombstones]
         state = {
-            'genre': last_updated
+            'genre': last_cursor,
+            'genre_deleted': last_cursor_deleted
         }
 
         return (rows, state)
@@ -52,18 +65,15 @@ class GenreExtractor(Extractor):
 class EtlGenre(Etl):
     """Основной ETL-класс для Жанров."""
 
-    def save_state(self, state: dict):
-        if state['genre']:
-            self.state.set_state('genre', str(state['genre']))
-        return super().save_state(state)
-
 
-def create_genre_etl(psql_conn, state):
+def create_genre_etl(psql_conn, state, es, changes=None):
     """Создать ETL-класс для Жанров.
 
     Args:
         psql_conn: соединение с Postgres
         state: Класс для хранения состояния
+        es: Клиент Elasticsearch
+        changes: Уведомления об изменениях для индекса
 
     """
     return EtlGenre(connection=psql_conn,
@@ -71,4 +81,6 @@ def create_genre_etl(psql_conn, state):
                     state=state,
                     extractor_class=GenreExtractor,
                     model=Genre,
-                    index_name='genres')
+                    index_name='genres',
+                    es=es,
+                    changes=changes)
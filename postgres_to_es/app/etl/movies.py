@@ -1,10 +1,103 @@
-from dataclasses import dataclass
-from typing import ClassVar
-import datetime
+from dataclasses import dataclass, field
+from typing import ClassVar, Optional
+import logging
+
+from elasticsearch import Elasticsearch
+from elastic_transport import ConnectionError
+import backoff
 
 from app import config
 from app.models.filmwork import Filmwork
-from app.etl.base import Extractor, Etl
+from app.etl.base import Cursor, Extractor, Etl, MIN_ID, deduplicate
+from app.etl.bulk import BulkLoadError
+
+
+NAME_FIELDS = {
+    'film_work_genre': ['genres'],
+    'film_work_person': ['actors', 'writers', 'directors']
+}
+"""Вложенные поля документа, которые затрагивает переименование."""
+
+RENAME_SCRIPT = """
+    boolean changed = false;
+    for (field in params.fields) {
+        def items = ctx._source[field];
+        if (items == null) {
+            continue;
+        }
+        boolean renamed = false;
+        for (item in items) {
+            def name = params.names[item.id];
+            if (name == null || name == item.name) {
+                continue;
+            }
+            item.name = name;
+            renamed = true;
+        }
+        if (!renamed) {
+            continue;
+        }
+        // массив собирается заново: одно имя могут носить несколько
+        // записей, а переименованное может совпасть с оставшимся
+        if (ctx._source.containsKey(field + '_names')) {
+            def names = new TreeSet();
+            for (item in items) {
+                names.add(item.name);
+            }
+            ctx._source[field + '_names'] = new ArrayList(names);
+        }
+        changed = true;
+    }
+    if (!changed) {
+        ctx.op = 'noop';
+    }
+"""
+"""Painless-скрипт переименования вложенных записей и массивов *_names."""
+
+
+@backoff.on_exception(backoff.expo,
+                      ConnectionError,
+                      max_time=config.BACKOFF_MAX_TIME)
+def patch_names(es: Elasticsearch, index_name: str,
+                fields: list[str], names: dict[str, str]) -> int:
+    """Переименовать вложенные записи во всех документах индекса.
+
+    Args:
+        es: Клиент Elasticsearch
+        index_name: Название индекса
+        fields: Вложенные поля документа
+        names: Новые имена по id записи
+
+    Returns:
+        int: Кол-во измененных документов
+
+    Raises:
+        BulkLoadError: Если часть документов не обновлена
+
+    """
+    # документы предыдущих батчей должны быть видны поиску
+    es.indices.refresh(index=index_name)
+    query = {
+        'bool': {
+            'should': [
+                {'nested': {'path': field,
+                            'query': {'terms': {f'{field}.id': list(names)}}}}
+                for field in fields
+            ],
+            'minimum_should_match': 1
+        }
+    }
+    resp = es.update_by_query(index=index_name,
+                              query=query,
+                              script={'source': RENAME_SCRIPT,
+                                      'params': {'fields': fields,
+                                                 'names': names}},
+                              conflicts='proceed',
+                              refresh=True)
+    if resp['failures'] or resp['version_conflicts']:
+        raise BulkLoadError(f'Переименование в {index_name} применено '
+                            f'не ко всем документам')
+    return resp['updated']
 
 
 @dataclass
@@ -72,22 +165,17 @@ class FilmworkExtractor(Extractor):
     )
     """Столбцы Кинопроизведения в формате SQL для SELECT"""
 
-    def get_by_filmworks(self) -> tuple[list, datetime.datetime]:
-        """Получить сырые данные по измененным Кинопроизведениям и
-        дату-время последнего изменения."""
-
-        def get_where() -> str:
-            """Получить инструкцию WHERE для запроса."""
-            value = self.state.get_state('film_work')
-            if value:
-                return f"WHERE fw.updated_at > '{value}'"
-            return ''
-
-        where = get_where()
-        sql = f"""
+    SELECT_SQL: ClassVar[str] = f"""
             SELECT
-                {self.SELECT_COLUMNS}
+                {SELECT_COLUMNS}
                 ,fw.updated_at
+                ,GREATEST(
+                    fw.updated_at,
+                    MAX(p.updated_at),
+                    MAX(pfw.created_at),
+                    MAX(g.updated_at),
+                    MAX(gfw.created_at)
+                ) as version_at
             FROM
                 content.film_work fw
                 LEFT JOIN content.person_film_work pfw
@@ -98,104 +186,287 @@ class FilmworkExtractor(Extractor):
                     ON gfw.film_work_id = fw.id
                 LEFT JOIN content.genre g
                     ON g.id = gfw.genre_id
+    """
+    """Запрос Кинопроизведений со связанными записями без условий."""
+
+    DOCUMENT_SQL: ClassVar[str] = (
+        """
+            SELECT
+                d.id,
+                d.imdb_rating,
+                d.title,
+                d.description,
+                d.creation_date,
+                d.file_url,
+                d.type,
+                d.actors_names,
+                d.writers_names,
+                d.actors,
+                d.writers,
+                d.directors,
+                d.genres,
+                d.updated_at,
+                d.version_at
+            FROM
+                content.film_work_document d
+        """
+    )
+    """Запрос собранных триггерами Кинопроизведений без условий."""
+
+    FULL_SQL: ClassVar[str] = (DOCUMENT_SQL if config.MOVIES_READ_MODEL
+                               else f'{SELECT_SQL} GROUP BY fw.id')
+
+    STATE_KEYS: ClassVar[tuple] = ('film_work', 'film_work_genre',
+                                   'film_work_person', 'film_work_deleted',
+                                   'film_work_genre_link',
+                                   'film_work_person_link')
+
+    ID_SOURCE_SQL: ClassVar[str] = 'SELECT id FROM content.film_work'
+
+    sources: dict[str, list] = field(default_factory=dict, init=False)
+    """Потоки изменений, вызвавшие обновление каждого Кинопроизведения."""
+    renames: dict[str, dict] = field(default_factory=dict, init=False)
+    """Новые имена жанров и персон по ключу потока изменений."""
+
+    def get_by_filmworks(self) -> tuple[list, Optional[Cursor]]:
+        """Получить id измененных Кинопроизведений и
+        позицию курсора последней строки."""
+
+        where, params = self.get_keyset('film_work', 'fw.updated_at, fw.id')
+        sql = f"""
+            SELECT
+                fw.id,
+                fw.updated_at
+            FROM
+                content.film_work fw
             {where}
-            GROUP BY
-                fw.id
             ORDER BY
-                fw.updated_at
+                fw.updated_at, fw.id
             LIMIT {self.rows_limit};
         """
-        return self.execute_sql(sql)
+        rows, last_cursor = self.execute_sql(sql, params)
+        return ([row['id'] for row in rows], last_cursor)
+
+    def get_by_links(self, key: str,
+                     link_table: str) -> tuple[list, Optional[Cursor]]:
+        """Получить id Кинопроизведений по новым связям и
+        позицию курсора последней строки.
 
-    def get_by_genres(self) -> tuple[list, datetime.datetime]:
-        """Получить сырые данные по измененным жанрам и
-        дату-время последнего изменения."""
+        Добавление связи не меняет updated_at ни Кинопроизведения,
+        ни жанра или персоны, поэтому читается отдельным потоком.
 
-        def get_having() -> str:
-            """Получить инструкцию HAVING для запроса."""
-            value = self.state.get_state('film_work_genre')
-            if value:
-                return f"HAVING MAX(g.updated_at) > '{value}'"
-            return ''
+        Args:
+            key: Ключ состояния
+            link_table: Таблица связи с Кинопроизведениями
 
-        having = get_having()
+        """
+        where, params = self.get_keyset(key, 'l.created_at, l.id')
         sql = f"""
             SELECT
-                {self.SELECT_COLUMNS}
-                ,MAX(g.updated_at) as updated_at
+                l.id,
+                l.film_work_id,
+                l.created_at as updated_at
             FROM
-                content.film_work fw
-                JOIN content.genre_film_work gfw
-                    ON gfw.film_work_id = fw.id
-                JOIN content.genre g
-                    ON g.id = gfw.genre_id
-                LEFT JOIN content.person_film_work pfw
-                    ON pfw.film_work_id = fw.id
-                LEFT JOIN content.person p
-                    ON p.id = pfw.person_id
-            GROUP BY
-                fw.id
-            {having}
+                content.{link_table} l
+            {where}
             ORDER BY
-                updated_at
+                l.created_at, l.id
             LIMIT {self.rows_limit};
         """
-        return self.execute_sql(sql)
+        rows, last_cursor = self.execute_sql(sql, params)
+        return ([row['film_work_id'] for row in rows], last_cursor)
 
-    def get_by_persons(self) -> tuple[list, datetime.datetime]:
-        """Получить сырые данные по измененным персоналиям и
-        дату-время последнего изменения."""
+    def get_renames(self, key: str, table: str,
+                    name_column: str) -> tuple[dict, Optional[Cursor]]:
+        """Получить новые имена измененных записей таблицы
+        и позицию курсора последней строки.
 
-        def get_having() -> str:
-            """Получить инструкцию HAVING для запроса."""
-            value = self.state.get_state('film_work_person')
-            if value:
-                return f"HAVING MAX(p.updated_at) > '{value}'"
-            return ''
+        Args:
+            key: Ключ состояния
+            table: Таблица связанной сущности
+            name_column: Столбец с именем
+
+        """
+        where, params = '', ()
+        cursor = self.get_cursor(key, 3)
+        if cursor:
+            updated_at, id, film_id = cursor
+            # незавершенную очередь Кинопроизведений по записи
+            # закрывает ее переименование
+            operator = '>' if film_id == MIN_ID else '>='
+            where = f'WHERE (t.updated_at, t.id) {operator} (%s, %s)'
+            params = (updated_at, id)
 
-        having = get_having()
         sql = f"""
             SELECT
-                {self.SELECT_COLUMNS}
-                ,MAX(p.updated_at) as updated_at
+                t.id,
+                t.{name_column} as name,
+                t.updated_at
             FROM
-                content.film_work fw
-                JOIN content.person_film_work pfw
-                    ON pfw.film_work_id = fw.id
-                JOIN content.person p
-                    ON p.id = pfw.person_id
-                LEFT JOIN content.genre_film_work gfw
-                    ON gfw.film_work_id = fw.id
-                LEFT JOIN content.genre g
-                    ON g.id = gfw.genre_id
-            GROUP BY
-                fw.id
-            {having}
+                content.{table} t
+            {where}
             ORDER BY
-                updated_at
+                t.updated_at, t.id
             LIMIT {self.rows_limit};
         """
-        return self.execute_sql(sql)
+        rows, last_cursor = self.execute_sql(sql, params)
+        if last_cursor:
+            last_cursor = (*last_cursor, MIN_ID)
+        return ({row['id']: row['name'] for row in rows}, last_cursor)
+
+    def get_by_related(self, key: str, table: str,
+                       link_table: str, link_column: str,
+                       name_column: str) -> tuple[list, Optional[Cursor]]:
+        """Получить id Кинопроизведений, связанных с измененными
+        записями таблицы, и позицию курсора последней строки.
+
+        Изменение одной записи разворачивается в очередь связанных
+        Кинопроизведений, которая обрабатывается порциями по rows_limit.
+        Курсор включает id Кинопроизведения, поэтому изменение популярного
+        жанра или персоны продолжается со следующей порции, а не
+        пропускается.
+
+        Args:
+            key: Ключ состояния
+            table: Таблица связанной сущности
+            link_table: Таблица связи с Кинопроизведениями
+            link_column: Столбец таблицы связи с id сущности
+            name_column: Столбец с именем
+
+        """
+        if config.MOVIES_PARTIAL_UPDATES and self.get_cursor(key):
+            # при первом запуске документов в индексе еще нет,
+            # поэтому частичное обновление возможно только после него
+            names, last_cursor = self.get_renames(key, table, name_column)
+            if names:
+                self.renames[key] = names
+            return ([], last_cursor)
+
+        where, params = self.get_keyset(key,
+                                        't.updated_at, t.id, l.film_work_id')
+        if params:
+            # ограничение по индексу (updated_at, id) связанной таблицы
+            where += ' AND (t.updated_at, t.id) >= (%s, %s)'
+            params = (*params, *params[:2])
+
+        sql = f"""
+            SELECT DISTINCT
+                t.updated_at,
+                t.id,
+                l.film_work_id
+            FROM
+                content.{table} t
+                JOIN content.{link_table} l
+                    ON l.{link_column} = t.id
+            {where}
+            ORDER BY
+                t.updated_at, t.id, l.film_work_id
+            LIMIT {self.rows_limit};
+        """
+        rows, last_cursor = self.execute_sql(
+            sql, params, cursor_columns=('updated_at', 'id', 'film_work_id')
+        )
+        return ([row['film_work_id'] for row in rows], last_cursor)
+
+    def get_by_genres(self) -> tuple[list, Optional[Cursor]]:
+        """Получить id Кинопроизведений по измененным жанрам и
+        позицию курсора последней строки."""
+        return self.get_by_related('film_work_genre', 'genre',
+                                   'genre_film_work', 'genre_id', 'name')
+
+    def get_by_persons(self) -> tuple[list, Optional[Cursor]]:
+        """Получить id Кинопроизведений по измененным персоналиям и
+        позицию курсора последней строки."""
+        return self.get_by_related('film_work_person', 'person',
+                                   'person_film_work', 'person_id',
+                                   'full_name')
+
+    def enrich(self, film_ids: list) -> list:
+        """Собрать Кинопроизведения по списку id одним запросом.
+
+        Args:
+            film_ids: Список id Кинопроизведений
+
+        Returns:
+            list: Сырые данные Кинопроизведений
+
+        """
+        if not film_ids:
+            return []
+
+        if config.MOVIES_READ_MODEL:
+            sql = f"""
+                {self.DOCUMENT_SQL}
+                WHERE
+                    d.id = ANY(%s::uuid[]);
+            """
+        else:
+            sql = f"""
+                {self.SELECT_SQL}
+                WHERE
+                    fw.id = ANY(%s::uuid[])
+                GROUP BY
+                    fw.id;
+            """
+        return [row for rows in self.fetch(sql, (film_ids,)) for row in rows]
 
     def get(self) -> tuple[list, dict]:
         """Получить кинопроизведения, измененные по
         Кинопроизведениям, Жанрам и Персоналиям.
 
+        Сначала дешево собираются id измененных Кинопроизведений
+        по каждой таблице, новым и удаленным связям и уведомлениям, затем id
+        объединяются без повторов и обогащаются одним запросом.
+        Удаленные Кинопроизведения попадают в deleted_ids.
+
         Returns:
             tuple[list[Any], dict]: Список кинопроизведений и словарь
-                                    с датой-временем последнего изменения
-                                    каждой таблицы
+                                    с позицией курсора каждой таблицы
 
         """
-        rows_by_filmworks, last_updated_filmwork = self.get_by_filmworks()
-        rows_by_genres, last_updated_genre = self.get_by_genres()
-        rows_by_persons, last_updated_person = self.get_by_persons()
-        rows = rows_by_filmworks + rows_by_genres + rows_by_persons
+        ids_by_filmworks, last_cursor_filmwork = self.get_by_filmworks()
+        ids_by_genres, last_cursor_genre = self.get_by_genres()
+        ids_by_persons, last_cursor_person = self.get_by_persons()
+        ids_by_genre_links, last_cursor_genre_link = self.get_by_links(
+            'film_work_genre_link', 'genre_film_work'
+        )
+        ids_by_person_links, last_cursor_person_link = self.get_by_links(
+            'film_work_person_link', 'person_film_work'
+        )
+        tombstones, last_cursor_deleted = self.get_tombstones(
+            'film_work_deleted',
+            ['film_work', 'genre_film_work', 'person_film_work']
+        )
+        # удаление связи меняет состав Кинопроизведения,
+        # удаление самого Кинопроизведения убирает его из индекса
+        ids_by_links = [row['film_work_id'] for row in tombstones
+                        if row['table_name'] != 'film_work']
+        for row in tombstones:
+            if row['table_name'] != 'film_work':
+                self.touch(row['film_work_id'], row['updated_at'])
+        deleted_ids = [row['entity_id'] for row in tombstones
+                       if row['table_name'] == 'film_work']
+
+        self.sources, self.duplicates = deduplicate({
+            'film_work': ids_by_filmworks,
+            'film_work_genre': ids_by_genres,
+            'film_work_person': ids_by_persons,
+            'film_work_genre_link': ids_by_genre_links,
+            'film_work_person_link': ids_by_person_links,
+            'film_work_deleted': ids_by_links,
+            'notify': self.pushed_ids
+        })
+        rows = self.enrich(list(self.sources))
+        found = {str(row['id']) for row in rows}
+        self.deleted_ids = [id for id in deleted_ids if id not in found]
 
         state = {
-            'film_work': last_updated_filmwork,
-            'film_work_genre': last_updated_genre,
-            'film_work_person': last_updated_person
+            'film_work': last_cursor_filmwork,
+            'film_work_genre': last_cursor_genre,
+            'film_work_person': last_cursor_person,
+            'film_work_genre_link': last_cursor_genre_link,
+            'film_work_person_link': last_cursor_person_link,
+            'film_work_deleted': last_cursor_deleted
         }
 
         return (rows, state)
@@ -204,25 +475,31 @@ class FilmworkExtractor(Extractor):
 class EtlFilmwork(Etl):
     """Основной ETL-класс для Кинопроизведений."""
 
-    def save_state(self, state: dict):
-        if state['film_work']:
-            self.state.set_state('film_work',
-                                 str(state['film_work']))
-        if state['film_work_genre']:
-            self.state.set_state('film_work_genre',
-                                 str(state['film_work_genre']))
-        if state['film_work_person']:
-            self.state.set_state('film_work_person',
-                                 str(state['film_work_person']))
-        return super().save_state(state)
+    def after_load(self, extractor: FilmworkExtractor):
+        """Применить переименования жанров и персон к индексу.
+
+        Args:
+            extractor: Класс извлечения данных текущего прохода
+
+        """
+        for key, names in extractor.renames.items():
+            updated = patch_names(self.es, self.index_name,
+                                  NAME_FIELDS[key], names)
+            logging.info(f'Переименовано {len(names)} записей '
+                         f'в {updated} документах {self.index_name}')
+        if extractor.renames:
+            # документы изменены в индексе, их хэши устарели
+            self.digests.clear()
 
 
-def create_filmwork_etl(psql_conn, state):
+def create_filmwork_etl(psql_conn, state, es, changes=None):
     """Создать ETL-класс для Кинопроизведений.
 
     Args:
         psql_conn: соединение с Postgres
         state: Класс для хранения состояния
+        es: Клиент Elasticsearch
+        changes: Уведомления об изменениях для индекса
 
     """
     return EtlFilmwork(connection=psql_conn,
@@ -230,4 +507,6 @@ def create_filmwork_etl(psql_conn, state):
                        state=state,
                        extractor_class=FilmworkExtractor,
                        model=Filmwork,
-                       index_name='movies')
+                       index_name='movies',
+                       es=es,
+                       changes=changes)
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import ClassVar
 
 from app import config
 from app.models.person import Person
@@ -9,42 +10,93 @@ from app.etl.base import Extractor, Etl
 class PersonExtractor(Extractor):
     """Класс извлечения данных из Postgres."""
 
-    def get(self) -> tuple[list, dict]:
-        """Получить измененные персоналии.
+    STATE_KEYS: ClassVar[tuple] = ('person', 'person_deleted')
 
-        Returns:
-            tuple[list[Any], dict]: Список персоналий и словарь
-                                    с датой-временем последнего изменения
-                                    таблицы
+    ID_SOURCE_SQL: ClassVar[str] = (
+        """
+            SELECT p.id
+            FROM content.person p
+            WHERE EXISTS (
+                SELECT 1
+                FROM content.person_film_work pfw
+                WHERE pfw.person_id = p.id
+            )
+        """
+    )
+
+    SELECT_SQL: ClassVar[str] = (
         """
-        def get_where() -> str:
-            """Получить инструкцию WHERE для запроса."""
-            value = self.state.get_state('person')
-            if value:
-                return f"WHERE p.updated_at > '{value}'"
-            return ''
-
-        where = get_where()
-        sql = f"""
             SELECT
                 p.id,
                 p.full_name,
                 p.updated_at,
                 ARRAY_AGG(DISTINCT pfw.role) AS roles,
-                ARRAY_AGG(DISTINCT pfw.film_work_id)::text[] AS film_ids
+                ARRAY_AGG(DISTINCT pfw.film_work_id)::text[] AS film_ids,
+                GREATEST(p.updated_at, MAX(pfw.created_at)) AS version_at
             FROM
                 content.person p
                 JOIN content.person_film_work pfw ON p.id = pfw.person_id
+        """
+    )
+    """Запрос персоналий, участвующих в Кинопроизведениях, без условий."""
+
+    FULL_SQL: ClassVar[str] = f'{SELECT_SQL} GROUP BY p.id'
+
+    def get_sql(self, where: str) -> str:
+        """Получить запрос персоналий, участвующих в Кинопроизведениях.
+
+        Args:
+            where: Условие отбора персоналий
+
+        """
+        return f"""
+            {self.SELECT_SQL}
             {where}
             GROUP BY
                 p.id
             ORDER BY
-                p.updated_at
+                p.updated_at, p.id
             LIMIT {self.rows_limit};
         """
-        rows, last_updated = self.execute_sql(sql)
+
+    def get(self) -> tuple[list, dict]:
+        """Получить измененные персоналии.
+
+        Персоналии, у которых удалили связь с Кинопроизведением,
+        собираются заново, а оставшиеся без Кинопроизведений
+        и удаленные попадают в deleted_ids.
+
+        Returns:
+            tuple[list[Any], dict]: Список персоналий и словарь
+                                    с позицией курсора таблицы
+                                    и записей об удалении
+        """
+        where, params = self.get_keyset('person', 'p.updated_at, p.id')
+        rows, last_cursor = self.execute_sql(self.get_sql(where), params)
+
+        tombstones, last_cursor_deleted = self.get_tombstones(
+            'person_deleted', ['person', 'person_film_work']
+        )
+        for row in tombstones:
+            if row['table_name'] == 'person_film_work':
+                self.touch(row['person_id'], row['updated_at'])
+        affected_ids = list(dict.fromkeys(
+            row['entity_id'] if row['table_name'] == 'person'
+            else row['person_id']
+            for row in tombstones
+        ))
+        if affected_ids:
+            sql = self.get_sql('WHERE p.id = ANY(%s::uuid[])')
+            rebuilt = [row for chunk in self.fetch(sql, (affected_ids,))
+                       for row in chunk]
+            known = {str(row['id']) for row in rows}
+            rows += [row for row in rebuilt if str(row['id']) not in known]
+            found = known | {str(row['id']) for row in rebuilt}
+            self.deleted_ids = [id for id in affected_ids if id not in found]
+
         state = {
-            'person': last_updated
+            'person': last_cursor,
+            'person_deleted': last_cursor_deleted
         }
 
         return (rows, state)
@@ -53,18 +105,15 @@ class PersonExtractor(Extractor):
 class EtlGenre(Etl):
     """Основной ETL-класс для Персоналий."""
 
-    def save_state(self, state: dict):
-        if state['person']:
-            self.state.set_state('person', str(state['person']))
-        return super().save_state(state)
-
 
-def create_person_etl(psql_conn, state):
+def create_person_etl(psql_conn, state, es, changes=None):
     """Создать ETL-класс для Персоналий.
 
     Args:
         psql_conn: соединение с Postgres
         state: Класс для хранения состояния
+        es: Клиент Elasticsearch
+        changes: Уведомления об изменениях для индекса
 
     """
     return EtlGenre(connection=psql_conn,
@@ -72,4 +121,6 @@ def create_person_etl(psql_conn, state):
                     state=state,
                     extractor_class=PersonExtractor,
                     model=Person,
-                    index_name='persons')
+                    index_name='persons',
+                    es=es,
+                    changes=changes)
@@ -0,0 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+import logging
+import time
+import uuid
+
+from elasticsearch import Elasticsearch
+
+from app import config
+from app.etl.base import Etl, MIN_ID, load, transform
+from app.state import State
+from app.utils import es_init, psql_connect, storage_init
+
+
+def split_ids(count: int) -> list[tuple[str, Optional[str]]]:
+    """Разбить пространство UUID на равные диапазоны.
+
+    Args:
+        count: Кол-во диапазонов
+
+    Returns:
+        list[tuple[str, Optional[str]]]: Нижняя граница, не включая,
+                                         и верхняя включительно
+
+    """
+    bounds = [MIN_ID]
+    bounds += [str(uuid.UUID(int=i * 2 ** 128 // count))
+               for i in range(1, count)]
+    bounds.append(None)
+    return list(zip(bounds, bounds[1:]))
+
+
+def load_partition(create_etl: Callable[..., Etl], after: str,
+                   upper: Optional[str], key: Optional[str] = None,
+                   index_name: Optional[str] = None) -> int:
+    """Загрузить документы диапазона id.
+
+    Выполняется в отдельном процессе со своими соединениями
+    с Postgres и Elasticsearch.
+
+    Args:
+        create_etl: Функция создания ETL-класса индекса
+        after: Нижняя граница id, не включая
+        upper: Верхняя граница id включительно, None - без границы
+        key: Ключ состояния с id последнего загруженного документа,
+             None - не сохранять позицию
+        index_name: Индекс для загрузки, None - индекс ETL
+
+    Returns:
+        int: Кол-во загруженных документов
+
+    """
+    es = es_init()
+    state = State(storage_init())
+    if key:
+        after = state.get_state(key) or after
+    count = 0
+    with psql_connect() as psql_conn:
+        etl = create_etl(psql_conn=psql_conn, state=state, es=es)
+        extractor = etl.extractor_class(connection=psql_conn,
+                                        rows_limit=etl.rows_limit,
+                                        state=state)
+        for rows in extractor.stream(after, upper):
+            load(es, transform(rows, etl.model),
+                 index_name or etl.index_name,
+                 versions=extractor.get_versions(rows))
+            count += len(rows)
+            if key:
+                state.set_state(key, str(rows[-1]['id']))
+    return count
+
+
+@dataclass
+class InitialLoad:
+    """Начальная загрузка индекса в несколько процессов.
+
+    Пространство id разбивается на диапазоны, каждый загружается
+    своим процессом со своей позицией в состоянии. Когда все
+    диапазоны загружены, курсоры инкрементального ETL ставятся
+    на момент начала загрузки, и дальше индекс обновляется как обычно.
+
+    Args:
+        create_etl: Функция создания ETL-класса индекса
+        state: Состояние инкрементального ETL
+        es: Клиент Elasticsearch
+        workers: Кол-во процессов
+
+    """
+    create_etl: Callable[..., Etl]
+    state: State
+    es: Elasticsearch
+    workers: int = config.INITIAL_LOAD_WORKERS
+
+    def run(self) -> int:
+        """Загрузить индекс, если инкрементальный ETL еще не запускался.
+
+        Returns:
+            int: Кол-во загруженных документов
+
+        """
+        with psql_connect() as psql_conn:
+            etl = self.create_etl(psql_conn=psql_conn,
+                                  state=self.state,
+                                  es=self.es)
+            keys = etl.extractor_class.STATE_KEYS
+            if self.state.get_state(keys[0]):
+                return 0
+
+            started_key = f'{etl.index_name}_load_started'
+            started = self.state.get_state(started_key)
+            if not started:
+                with psql_conn.cursor() as curs:
+                    curs.execute('SELECT now();')
+                    started = str(curs.fetchone()[0])
+                self.state.set_state(started_key, started)
+
+        partitions = [(after, upper, f'{etl.index_name}_load_{after}')
+                      for after, upper in split_ids(self.workers)]
+        logging.info('[%s] Начальная загрузка в %d процессов',
+                     etl.index_name, self.workers)
+        start = time.perf_counter()
+        with ProcessPoolExecutor(self.workers) as pool:
+            futures = [pool.submit(load_partition, self.create_etl,
+                                   after, upper, key)
+                       for after, upper, key in partitions]
+            count = sum(future.result() for future in futures)
+        elapsed = time.perf_counter() - start
+        logging.info('[%s] Загружено %d документов за %.1f сек.',
+                     etl.index_name, count, elapsed)
+
+        # изменения, начавшиеся во время загрузки,
+        # догрузит инкрементальный ETL
+        with self.state.transaction():
+            for key in keys:
+                self.state.set_state(key, started)
+            for _, _, key in partitions:
+                self.state.set_state(key, '')
+            self.state.set_state(started_key, '')
+        return count
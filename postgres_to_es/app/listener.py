@@ -0,0 +1,135 @@
+from dataclasses import dataclass, field
+from typing import Optional
+import json
+import logging
+import select
+import threading
+
+from app import config
+from app.utils import psql_connect
+
+
+ROUTES = {
+    'film_work': [('movies', 'id')],
+    'genre': [('movies', None), ('genres', None)],
+    'person': [('movies', None), ('persons', None)],
+    'genre_film_work': [('movies', 'film_work_id'), ('genres', None)],
+    'person_film_work': [('movies', 'film_work_id'), ('persons', None)]
+}
+"""Индексы, затрагиваемые изменением таблицы, и поле уведомления
+с id Кинопроизведения, которое нужно передать в индекс."""
+
+
+@dataclass
+class ChangeFeed:
+    """Уведомления об изменениях для одного индекса.
+
+    Args:
+        wake_event: Событие появления изменений
+        ids: id, переданные уведомлениями и еще не обработанные
+
+    """
+    wake_event: threading.Event = field(default_factory=threading.Event)
+    ids: set = field(default_factory=set)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def push(self, *ids: Optional[str]):
+        """Передать изменения и разбудить ETL.
+
+        Args:
+            ids: id измененных записей
+
+        """
+        with self.lock:
+            self.ids.update(id for id in ids if id)
+            self.wake_event.set()
+
+    def drain(self) -> list:
+        """Забрать накопленные id.
+
+        Returns:
+            list: id измененных записей
+
+        """
+        with self.lock:
+            ids = list(self.ids)
+            self.ids.clear()
+            self.wake_event.clear()
+            return ids
+
+    def wait(self, timeout: float) -> bool:
+        """Дождаться изменений.
+
+        Args:
+            timeout: Макс. время ожидания в секундах
+
+        Returns:
+            bool: Изменения появились до истечения времени
+
+        """
+        return self.wake_event.wait(timeout)
+
+
+@dataclass
+class ChangeListener:
+    """Поток, получающий уведомления Postgres LISTEN/NOTIFY
+    и передающий их в ETL нужных индексов.
+
+    Args:
+        feeds: Уведомления по каждому индексу
+        stop_event: Событие остановки сервиса
+
+    """
+    feeds: dict[str, ChangeFeed]
+    stop_event: threading.Event
+    name: str = 'listener'
+
+    def dispatch(self, payload: str):
+        """Передать уведомление в ETL затронутых индексов.
+
+        Args:
+            payload: Уведомление в формате JSON
+
+        """
+        change = json.loads(payload)
+        for index, id_field in ROUTES.get(change['table'], []):
+            if index in self.feeds:
+                self.feeds[index].push(change.get(id_field))
+
+    def listen(self):
+        """Получать уведомления до остановки сервиса или ошибки."""
+        conn = psql_connect()
+        try:
+            conn.autocommit = True
+            with conn.cursor() as curs:
+                curs.execute(f'LISTEN {config.NOTIFY_CHANNEL};')
+            logging.info('Подписка на канал %s оформлена.',
+                         config.NOTIFY_CHANNEL)
+
+            # пока подписки не было, уведомления могли потеряться
+            for feed in self.feeds.values():
+                feed.push()
+
+            while not self.stop_event.is_set():
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    self.dispatch(conn.notifies.pop(0).payload)
+        finally:
+            conn.close()
+
+    def run(self):
+        """Слушать уведомления, переподключаясь при ошибках."""
+        error_delay = 0.1
+        while not self.stop_event.is_set():
+            try:
+                self.listen()
+            except Exception as e:
+                logging.error('[%s] %s', self.name, e, exc_info=True)
+                self.stop_event.wait(error_delay)
+                error_delay = min(error_delay * 2, config.BACKOFF_MAX_TIME)
+
+    def wake(self):
+        """Поток сам проверяет остановку раз в секунду."""
+        pass
@@ -1,46 +1,83 @@
-import time
+import argparse
 import logging
+import threading
 
 from app import config
 from app.etl.movies import create_filmwork_etl
 from app.etl.genres import create_genre_etl
 from app.etl.persons import create_person_etl
-from app.state import State, RedisStorage
-from app.utils import psql_connect, redis_init
+from app.initial_load import InitialLoad
+from app.listener import ChangeFeed, ChangeListener
+from app.metrics import start_metrics_server
+from app.reindex import Reindex
+from app.scheduler import EtlWorker, run_workers
+from app.state import State
+from app.utils import es_init, psql_connect, storage_init
+
+
+ETLS = {
+    'movies': create_filmwork_etl,
+    'genres': create_genre_etl,
+    'persons': create_person_etl
+}
+"""Функции создания ETL-класса по названию индекса."""
 
 
 def main():
-    logging.info('Сервис запущен.')
-    while True:
-        try:
-            with psql_connect() as psql_conn:
-                logging.info(
-                    'Соединение с БД установлено. '
-                    'Частота опроса БД: %d сек. '
-                    'Кол-во строк за один запрос: %d' % (config.SLEEP_SECONDS,
-                                                         config.ROWS_LIMIT)
-                )
-                redis = redis_init()
-                storage = RedisStorage(redis)
-                state = State(storage)
-
-                etl_filmwork = create_filmwork_etl(psql_conn=psql_conn,
-                                                   state=state)
-                etl_genre = create_genre_etl(psql_conn=psql_conn,
-                                             state=state)
-                etl_person = create_person_etl(psql_conn=psql_conn,
-                                               state=state)
-
-                while True:
-                    etl_filmwork.etl()
-                    etl_genre.etl()
-                    etl_person.etl()
-                    time.sleep(config.SLEEP_SECONDS)
-        except Exception as e:
-            logging.error(e, exc_info=True)
-            time.sleep(0.1)
-            continue
+    logging.info('Сервис запущен. '
+                 'Кол-во строк за один запрос: %d' % config.ROWS_LIMIT)
+    es = es_init()
+    start_metrics_server()
+    if config.INITIAL_LOAD_WORKERS > 1:
+        state = State(storage_init())
+        for create_etl in ETLS.values():
+            InitialLoad(create_etl=create_etl, state=state, es=es).run()
+
+    stop_event = threading.Event()
+    feeds = {}
+    if config.CHANGE_CAPTURE == 'notify':
+        feeds = {name: ChangeFeed() for name in ETLS}
+
+    workers = [
+        EtlWorker(name=name,
+                  create_etl=create_etl,
+                  es=es,
+                  poll_interval=config.SLEEP_SECONDS_BY_INDEX[name],
+                  stop_event=stop_event,
+                  changes=feeds.get(name))
+        for name, create_etl in ETLS.items()
+    ]
+    if feeds:
+        workers.append(ChangeListener(feeds=feeds, stop_event=stop_event))
+    run_workers(workers, stop_event)
+
+
+def reindex(names: list[str]):
+    """Переиндексировать индексы без остановки сервиса.
+
+    Args:
+        names: Названия индексов
+
+    """
+    es = es_init()
+    for name in names:
+        with psql_connect() as psql_conn:
+            Reindex(connection=psql_conn,
+                    state=State(storage_init()),
+                    create_etl=ETLS[name],
+                    es=es).run()
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command')
+    reindex_parser = subparsers.add_parser(
+        'reindex', help='пересобрать индексы и переключить псевдонимы'
+    )
+    reindex_parser.add_argument('names', nargs='*', choices=list(ETLS),
+                                default=list(ETLS))
+    args = parser.parse_args()
+    if args.command == 'reindex':
+        reindex(args.names)
+    else:
+        main()
@@ -0,0 +1,47 @@
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from app import config
+
+
+STAGE_SECONDS = Histogram(
+    'etl_stage_seconds',
+    'Длительность этапа прохода ETL',
+    ['index', 'stage']
+)
+"""Длительность этапов extract, transform, load и checkpoint."""
+
+BATCH_ROWS = Histogram(
+    'etl_batch_rows',
+    'Кол-во строк Postgres в батче',
+    ['index'],
+    buckets=(0, 1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+)
+"""Размер батча в строках."""
+
+BATCH_BYTES = Histogram(
+    'etl_batch_bytes',
+    'Размер запросов _bulk батча в байтах',
+    ['index'],
+    buckets=tuple(1024 * 4 ** i for i in range(10))
+)
+"""Размер батча в байтах NDJSON."""
+
+DUPLICATES = Counter(
+    'etl_duplicates',
+    'Кол-во повторных id, удаленных при объединении потоков изменений',
+    ['index']
+)
+"""Повторы, не отправленные в Elasticsearch."""
+
+LAG_SECONDS = Gauge(
+    'etl_lag_seconds',
+    'Отставание индекса от Postgres',
+    ['index']
+)
+"""Отставание индекса от Postgres в секундах."""
+
+
+def start_metrics_server():
+    """Отдавать метрики в формате Prometheus, если задан METRICS_PORT."""
+    if config.METRICS_PORT:
+        start_http_server(config.METRICS_PORT, addr=config.METRICS_HOST)
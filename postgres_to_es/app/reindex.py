@@ -0,0 +1,176 @@
+from dataclasses import dataclass
+from typing import Callable
+import json
+import logging
+import math
+import os
+import time
+
+from elasticsearch import Elasticsearch
+from psycopg2._psycopg import connection
+
+from app.etl.base import Etl, load, transform
+from app.state import MemoryStorage, State
+
+
+SCHEMAS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                           'schemas')
+"""Каталог со схемами индексов в формате curl-запросов."""
+
+
+def read_schema(name: str) -> dict:
+    """Прочитать схему индекса из schemas/<name>.http.
+
+    Args:
+        name: Название индекса
+
+    Returns:
+        dict: Тело запроса создания индекса
+
+    """
+    with open(os.path.join(SCHEMAS_DIR, f'{name}.http'),
+              encoding='utf-8') as file:
+        request = file.read()
+    # тело запроса передается curl в одинарных кавычках после -d
+    body = request.split("-d'", 1)[1].rsplit("'", 1)[0]
+    return json.loads(body)
+
+
+@dataclass
+class Reindex:
+    """Полная переиндексация в новый индекс с переключением псевдонима.
+
+    Документы загружаются в версионированный индекс без обновления
+    поиска и реплик. Затем изменения, пришедшие за время загрузки,
+    догружаются инкрементальным ETL, и псевдоним атомарно переключается
+    на новый индекс, а старый удаляется. Сервис продолжает обновлять
+    индекс через псевдоним все это время.
+
+    Args:
+        connection: Соединение с БД Postgres
+        state: Состояние инкрементального ETL
+        create_etl: Функция создания ETL-класса индекса
+        es: Клиент Elasticsearch
+
+    """
+    connection: connection
+    state: State
+    create_etl: Callable[..., Etl]
+    es: Elasticsearch
+
+    def create_index(self, alias: str) -> tuple[str, dict]:
+        """Создать версионированный индекс для быстрой загрузки.
+
+        Args:
+            alias: Псевдоним индекса
+
+        Returns:
+            tuple[str, dict]: Название индекса и настройки,
+                              которые нужно вернуть после загрузки
+
+        """
+        index_name = f'{alias}_{time.strftime("%Y%m%d%H%M%S")}'
+        schema = read_schema(alias)
+        settings = schema['settings']
+        restore = {
+            'refresh_interval': settings.get('refresh_interval', '1s'),
+            'number_of_replicas': settings.get('number_of_replicas', 1)
+        }
+        self.es.indices.create(index=index_name,
+                               settings={**settings,
+                                         'refresh_interval': '-1',
+                                         'number_of_replicas': 0},
+                               mappings=schema['mappings'])
+        return (index_name, restore)
+
+    def catch_up(self, etl: Etl):
+        """Догрузить изменения, пока ETL не догонит Postgres.
+
+        Args:
+            etl: ETL, пишущий в новый индекс
+
+        """
+        while etl.etl().has_more:
+            pass
+
+    def fill_index(self, etl: Etl, index_name: str, restore: dict):
+        """Загрузить все документы в новый индекс, догрузить изменения
+        и вернуть настройки индекса.
+
+        Args:
+            etl: ETL, пишущий в новый индекс
+            index_name: Новый индекс
+            restore: Настройки, которые нужно вернуть после загрузки
+
+        """
+        extractor = etl.extractor_class(connection=self.connection,
+                                        rows_limit=etl.rows_limit,
+                                        state=etl.state)
+        count = 0
+        for rows in extractor.stream():
+            load(self.es, transform(rows, etl.model), index_name,
+                 versions=extractor.get_versions(rows))
+            count += len(rows)
+            logging.info('[%s] Загружено %d документов', index_name, count)
+
+        self.catch_up(etl)
+        self.es.indices.forcemerge(index=index_name, max_num_segments=1)
+        self.es.indices.put_settings(index=index_name, settings=restore)
+        self.es.cluster.health(index=index_name, wait_for_status='yellow')
+        self.catch_up(etl)
+
+    def swap_alias(self, alias: str, index_name: str) -> list[str]:
+        """Атомарно переключить псевдоним на новый индекс
+        и удалить старые.
+
+        Args:
+            alias: Псевдоним индекса
+            index_name: Новый индекс
+
+        Returns:
+            list[str]: Удаленные индексы
+
+        """
+        if self.es.indices.exists_alias(name=alias):
+            old = list(self.es.indices.get_alias(name=alias))
+        elif self.es.indices.exists(index=alias):
+            # индекс, созданный скриптом из schemas, заменяется псевдонимом
+            old = [alias]
+        else:
+            old = []
+        actions = [{'add': {'index': index_name, 'alias': alias}}]
+        actions += [{'remove_index': {'index': index}} for index in old]
+        self.es.indices.update_aliases(actions=actions)
+        return old
+
+    def run(self):
+        """Переиндексировать индекс ETL."""
+        # изменения догружаются с позиций инкрементального ETL
+        # на момент начала, чтобы не потерять пришедшие во время загрузки
+        snapshot = MemoryStorage(dict(self.state.state))
+        etl = self.create_etl(psql_conn=self.connection,
+                              state=State(snapshot),
+                              es=self.es)
+        etl.next_reconcile_at = math.inf
+        alias = etl.index_name
+        etl.metrics_name = alias
+        index_name, restore = self.create_index(alias)
+        etl.index_name = index_name
+        logging.info('Переиндексация %s в %s', alias, index_name)
+
+        try:
+            self.fill_index(etl, index_name, restore)
+            old = self.swap_alias(alias, index_name)
+        except BaseException:
+            # недогруженный индекс не нужен, следующий запуск создаст новый
+            self.es.options(ignore_status=404).indices.delete(
+                index=index_name
+            )
+            logging.error('Переиндексация %s не удалась, индекс %s удален',
+                          alias, index_name)
+            raise
+        logging.info('Псевдоним %s переключен на %s, удалены: %s',
+                     alias, index_name, ', '.join(old) or '-')
+        # изменения, загруженные сервисом в старый индекс
+        # до переключения
+        self.catch_up(etl)
@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from typing import Callable, Optional
+import logging
+import threading
+
+from elasticsearch import Elasticsearch
+
+from app import config
+from app.etl.base import Etl
+from app.listener import ChangeFeed
+from app.state import State
+from app.utils import psql_connect, storage_init
+
+
+@dataclass
+class EtlWorker:
+    """Поток, в котором ETL одного индекса работает независимо от остальных.
+
+    Args:
+        name: Название индекса
+        create_etl: Функция создания ETL-класса
+        es: Клиент Elasticsearch
+        poll_interval: Через сколько секунд заново опрашивать Postgres
+        stop_event: Событие остановки сервиса
+        changes: Уведомления об изменениях для индекса
+
+    """
+    name: str
+    create_etl: Callable[..., Etl]
+    es: Elasticsearch
+    poll_interval: float
+    stop_event: threading.Event
+    changes: Optional[ChangeFeed] = None
+    lag: float = 0.0
+    """Отставание индекса от Postgres в секундах."""
+
+    @property
+    def idle_sleep_max(self) -> float:
+        """Макс. пауза между опросами Postgres без новых данных."""
+        if self.changes:
+            return config.NOTIFY_FALLBACK_SECONDS
+        return config.IDLE_SLEEP_MAX_SECONDS
+
+    def wait(self, timeout: float):
+        """Дождаться уведомления об изменениях, остановки или таймаута.
+
+        Args:
+            timeout: Макс. время ожидания в секундах
+
+        """
+        if self.changes:
+            self.changes.wait(timeout)
+        else:
+            self.stop_event.wait(timeout)
+
+    def wake(self):
+        """Прервать ожидание потока."""
+        if self.changes:
+            self.changes.push()
+
+    def run(self):
+        """Выполнять ETL до остановки сервиса.
+
+        Каждый поток держит свое соединение с Postgres и свое состояние.
+        Пока батчи приходят полными, следующий извлекается сразу.
+        Если новых данных нет, пауза между опросами удваивается
+        до IDLE_SLEEP_MAX_SECONDS. В режиме notify поток просыпается
+        по уведомлению, а опрос остается запасным вариантом
+        с паузой до NOTIFY_FALLBACK_SECONDS. При ошибке поток
+        переподключается с экспоненциальной задержкой,
+        не задерживая остальные индексы.
+
+        """
+        error_delay = 0.1
+        while not self.stop_event.is_set():
+            try:
+                with psql_connect() as psql_conn:
+                    logging.info(
+                        '[%s] Соединение с БД установлено. '
+                        'Частота опроса БД: %.1f сек.' % (self.name,
+                                                          self.poll_interval)
+                    )
+                    state = State(storage_init())
+                    etl = self.create_etl(psql_conn=psql_conn,
+                                          state=state,
+                                          es=self.es,
+                                          changes=self.changes)
+                    idle_delay = self.poll_interval
+                    while not self.stop_event.is_set():
+                        result = etl.etl()
+                        error_delay = 0.1
+                        self.lag = result.lag
+                        if result.rows or result.has_more:
+                            idle_delay = self.poll_interval
+                        if result.has_more:
+                            logging.info('[%s] Отставание от БД: %.1f сек.',
+                                         self.name, result.lag)
+                            continue
+                        self.wait(idle_delay)
+                        if not result.rows:
+                            idle_delay = min(idle_delay * 2,
+                                             self.idle_sleep_max)
+            except Exception as e:
+                logging.error('[%s] %s', self.name, e, exc_info=True)
+                self.stop_event.wait(error_delay)
+                error_delay = min(error_delay * 2, config.BACKOFF_MAX_TIME)
+
+
+def run_workers(workers: list, stop_event: threading.Event):
+    """Запустить каждый поток сервиса и дождаться остановки.
+
+    Args:
+        workers: ETL-потоки и поток уведомлений
+        stop_event: Событие остановки сервиса
+
+    """
+    threads = [threading.Thread(target=worker.run, name=worker.name)
+               for worker in workers]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        stop_event.set()
+        for worker in workers:
+            worker.wake()
+        for thread in threads:
+            thread.join()
@@ -1,5 +1,12 @@
-from dataclasses import dataclass
-from typing import Any
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, ClassVar, Iterator, Optional
+import fcntl
+import json
+import os
+import sqlite3
+import threading
 
 from redis import Redis
 from redis.exceptions import ConnectionError
@@ -8,15 +15,47 @@ import backoff
 from app import config
 
 
+LEGACY_KEYS = ('film_work', 'film_work_genre', 'film_work_person',
+               'genre', 'person')
+"""Ключи Redis, в которых состояние хранилось до перехода на хэш."""
+
+
+class BaseStorage(ABC):
+    """Хранилище состояния ETL."""
+
+    @abstractmethod
+    def save_state(self, state: dict) -> None:
+        """Сохранить состояние атомарно.
+
+        Args:
+            state: Словарь-состояние или его измененная часть
+
+        """
+
+    @abstractmethod
+    def retrieve_state(self) -> dict:
+        """Загрузить состояние.
+
+        Returns:
+            dict: Словарь-состояние
+
+        """
+
+
 @dataclass
-class RedisStorage():
+class RedisStorage(BaseStorage):
     """Класс для хранения состояния в Redis.
 
+    Состояние хранится в одном хэше, поэтому загружается одним HGETALL,
+    а изменения сохраняются одной транзакцией MULTI/EXEC.
+
     Args:
         redis: Драйвер Redis
+        key: Ключ хэша с состоянием
 
     """
     redis: Redis
+    key: str = config.STATE_KEY
 
     @backoff.on_exception(backoff.expo,
                           ConnectionError,
@@ -25,10 +64,12 @@ class RedisStorage():
         """Сохранить состояние в БД.
 
         Args:
-            state: Словарь-состояние
+            state: Словарь-состояние или его измененная часть
 
         """
-        self.redis.mset(state)
+        with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.key, mapping=state)
+            pipe.execute()
 
     @backoff.on_exception(backoff.expo,
                           ConnectionError,
@@ -40,8 +81,163 @@ class RedisStorage():
             dict: Словарь-состояние
 
         """
-        r = self.redis
-        return {key: r.get(key) for key in r.keys()}
+        state = self.redis.hgetall(self.key)
+        if not state:
+            state = self.retrieve_legacy_state()
+            if state:
+                self.save_state(state)
+        return state
+
+    def retrieve_legacy_state(self) -> dict:
+        """Загрузить состояние, сохраненное отдельными ключами
+        до перехода на хэш.
+
+        Returns:
+            dict: Словарь-состояние
+
+        """
+        values = self.redis.mget(LEGACY_KEYS)
+        return {key: value for key, value in zip(LEGACY_KEYS, values)
+                if value is not None}
+
+
+@dataclass
+class JsonFileStorage(BaseStorage):
+    """Класс для хранения состояния в локальном JSON-файле.
+
+    Файл перезаписывается целиком через временный файл и rename,
+    поэтому после сбоя на диске остается либо старое, либо новое
+    состояние. Все изменения одной транзакции State попадают
+    в одну запись с одним fsync. Запись защищена блокировкой
+    файла path.lock, поэтому файл могут делить несколько процессов.
+
+    Args:
+        path: Путь к файлу состояния
+
+    """
+    path: str = config.STATE_FILE_PATH
+    lock: ClassVar[threading.Lock] = threading.Lock()
+    """Блокировка записи, общая для потоков процесса."""
+
+    def save_state(self, state: dict) -> None:
+        """Сохранить состояние в файл.
+
+        Args:
+            state: Словарь-состояние или его измененная часть
+
+        """
+        with self.lock, open(f'{self.path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # дописываем к сохраненному, чтобы не затереть ключи,
+            # которые параллельно обновляют другие ETL
+            saved = self.retrieve_state()
+            saved.update(state)
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(saved, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+            self.fsync_dir()
+
+    def retrieve_state(self) -> dict:
+        """Загрузить состояние из файла.
+
+        Returns:
+            dict: Словарь-состояние
+
+        """
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def fsync_dir(self) -> None:
+        """Сбросить на диск запись каталога после rename."""
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)),
+                     os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+@dataclass
+class SqliteStorage(BaseStorage):
+    """Класс для хранения состояния в локальной БД SQLite.
+
+    БД работает в режиме WAL: изменения транзакции State сохраняются
+    одной транзакцией SQLite, а чтение не блокирует запись.
+
+    Args:
+        path: Путь к файлу БД
+
+    """
+    path: str = config.STATE_SQLITE_PATH
+
+    def __post_init__(self):
+        """Открыть БД и создать таблицу состояния."""
+        self.connection = sqlite3.connect(self.path, timeout=30.0)
+        self.connection.execute('PRAGMA journal_mode=WAL;')
+        self.connection.execute('PRAGMA synchronous=NORMAL;')
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS state '
+                '(key TEXT PRIMARY KEY, value TEXT);'
+            )
+
+    def save_state(self, state: dict) -> None:
+        """Сохранить состояние в БД.
+
+        Args:
+            state: Словарь-состояние или его измененная часть
+
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO state (key, value) VALUES (?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value;',
+                state.items()
+            )
+
+    def retrieve_state(self) -> dict:
+        """Загрузить состояние из БД.
+
+        Returns:
+            dict: Словарь-состояние
+
+        """
+        return dict(self.connection.execute('SELECT key, value FROM state;'))
+
+
+@dataclass
+class MemoryStorage(BaseStorage):
+    """Класс для хранения состояния в памяти процесса.
+
+    Args:
+        state: Начальное состояние
+
+    """
+    state: dict = field(default_factory=dict)
+
+    def save_state(self, state: dict) -> None:
+        """Сохранить состояние в памяти.
+
+        Args:
+            state: Словарь-состояние или его измененная часть
+
+        """
+        self.state.update(state)
+
+    def retrieve_state(self) -> dict:
+        """Загрузить копию состояния.
+
+        Returns:
+            dict: Словарь-состояние
+
+        """
+        return dict(self.state)
 
 
 @dataclass
@@ -53,22 +249,46 @@ class State:
         storage: Хранилище для постоянного хранения состояния
 
     """
-    storage: RedisStorage
+    storage: BaseStorage
 
     def __post_init__(self):
         """Инициализировать состояние."""
         self.state = self.storage.retrieve_state()
+        self.pending: Optional[dict] = None
+
+    @contextmanager
+    def transaction(self) -> Iterator['State']:
+        """Накопить изменения состояния и сохранить их одной транзакцией.
+
+        Если блок завершился ошибкой, ни одно изменение не сохраняется.
+
+        """
+        self.pending = {}
+        try:
+            yield self
+            if self.pending:
+                self.storage.save_state(self.pending)
+                self.state.update(self.pending)
+        finally:
+            self.pending = None
 
     def set_state(self, key: str, value: Any) -> None:
         """Сохранить состояние.
 
+        Внутри transaction() значение сохраняется при выходе из блока.
+
         Args:
             key: Ключ
             value: Значение
 
         """
+        if self.pending is not None:
+            self.pending[key] = value
+            return
         self.state[key] = value
-        self.storage.save_state(self.state)
+        # сохраняем только измененный ключ, чтобы не затереть ключи,
+        # которые параллельно обновляют другие ETL
+        self.storage.save_state({key: value})
 
     def get_state(self, key: str) -> Any:
         """Получить состояние по ключу.
@@ -2,9 +2,11 @@ import psycopg2
 from psycopg2.extras import DictCursor
 from psycopg2 import OperationalError
 from redis import Redis
+from elasticsearch import Elasticsearch
 import backoff
 
 from app import config
+from app.state import BaseStorage, JsonFileStorage, RedisStorage, SqliteStorage
 
 
 @backoff.on_exception(backoff.expo, OperationalError, max_time=10)
@@ -16,3 +18,27 @@ def psql_connect():
 def redis_init():
     """Инициализировать Redis."""
     return Redis(**config.REDIS_DSN, decode_responses=True)
+
+
+def storage_init() -> BaseStorage:
+    """Инициализировать хранилище состояния, выбранное в STATE_STORAGE."""
+    if config.STATE_STORAGE == 'file':
+        return JsonFileStorage()
+    if config.STATE_STORAGE == 'sqlite':
+        return SqliteStorage()
+    return RedisStorage(redis_init())
+
+
+def es_init():
+    """Инициализировать долгоживущий клиент Elasticsearch.
+
+    Клиент держит пул keep-alive соединений и переиспользуется
+    всеми ETL между батчами.
+
+    """
+    host = config.ES['HOST']
+    port = config.ES['PORT']
+    return Elasticsearch(f"http://{host}:{port}",
+                         connections_per_node=config.ES['POOL_SIZE'],
+                         http_compress=config.ES['HTTP_COMPRESS'],
+                         request_timeout=config.ES['REQUEST_TIMEOUT'])
@@ -0,0 +1,116 @@
+"""Сравнение задержки загрузки батча: новый клиент ES на каждый батч
+против общего пула keep-alive соединений.
+
+Запуск из каталога postgres_to_es:
+
+    python -m benchmarks.es_client
+
+"""
+import gzip
+import json
+import logging
+import statistics
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+
+from app import config
+from app.utils import es_init
+
+
+BATCHES = 200
+"""Кол-во батчей на один прогон."""
+
+ROWS = 100
+"""Кол-во документов в батче."""
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Заглушка Elasticsearch, отвечающая на _bulk без задержки."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections = 0
+
+    def setup(self):
+        StandInHandler.connections += 1
+        super().setup()
+
+    def do_PUT(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        lines = body.splitlines()
+        items = [{'index': {'_id': json.loads(line)['index']['_id'],
+                            'status': 201}}
+                 for line in lines[::2]]
+        self.send_json({'took': 1, 'errors': False, 'items': items})
+
+    def send_json(self, data: dict):
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('X-Elastic-Product', 'Elasticsearch')
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_POST = do_PUT
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_batch() -> list[dict]:
+    """Сформировать батч документов, похожих на кинопроизведения."""
+    return [{'_index': 'movies',
+             '_id': str(uuid.uuid4()),
+             '_source': {'title': 'Star Wars', 'description': 'x' * 500}}
+            for _ in range(ROWS)]
+
+
+def run(get_client) -> list[float]:
+    """Загрузить BATCHES батчей и вернуть задержку каждого в мс."""
+    timings = []
+    for _ in range(BATCHES):
+        batch = make_batch()
+        start = time.perf_counter()
+        get_client(batch)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list[float]):
+    print(f'{name:<20} median {statistics.median(timings):7.2f} ms, '
+          f'p95 {sorted(timings)[int(len(timings) * 0.95)]:7.2f} ms, '
+          f'TCP connections {StandInHandler.connections}')
+    StandInHandler.connections = 0
+
+
+def main():
+    logging.getLogger('elastic_transport').setLevel(logging.WARNING)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    config.ES['HOST'], config.ES['PORT'] = server.server_address
+
+    def per_batch(batch):
+        with Elasticsearch(f"http://{config.ES['HOST']}:"
+                           f"{config.ES['PORT']}") as es:
+            bulk(es, batch)
+
+    pooled_es = es_init()
+
+    def pooled(batch):
+        bulk(pooled_es, batch)
+
+    report('client per batch', run(per_batch))
+    report('pooled client', run(pooled))
+    pooled_es.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Масштабирование начальной загрузки индекса movies по числу процессов.
+
+Кинопроизведения загружаются во временный индекс сначала одним
+процессом, затем двумя, четырьмя и так далее до числа ядер.
+Запускать против локального окружения docker-compose из каталога
+postgres_to_es (модели импортируются относительно app):
+
+    PYTHONPATH=app python -m benchmarks.initial_load
+
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.etl.movies import create_filmwork_etl
+from app.initial_load import load_partition, split_ids
+from app.reindex import read_schema
+from app.utils import es_init
+
+
+INDEX = 'movies_benchmark'
+"""Временный индекс, чтобы не затронуть индекс movies."""
+
+
+def measure(workers: int) -> tuple[int, float]:
+    """Загрузить все Кинопроизведения и вернуть кол-во и время."""
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(load_partition, create_filmwork_etl,
+                               after, upper, index_name=INDEX)
+                   for after, upper in split_ids(workers)]
+        count = sum(future.result() for future in futures)
+    return (count, time.perf_counter() - start)
+
+
+def main():
+    es = es_init()
+    schema = read_schema('movies')
+    workers = 1
+    baseline = None
+    try:
+        while workers <= (os.cpu_count() or 1):
+            es.options(ignore_status=404).indices.delete(index=INDEX)
+            es.indices.create(index=INDEX,
+                              settings=schema['settings'],
+                              mappings=schema['mappings'])
+            count, elapsed = measure(workers)
+            rate = count / elapsed
+            baseline = baseline or rate
+            print(f'{workers} proc: {rate:.0f} docs/s, '
+                  f'x{rate / baseline:.2f}')
+            workers *= 2
+    finally:
+        es.options(ignore_status=404).indices.delete(index=INDEX)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Замер задержки от изменения в Postgres до появления в Elasticsearch.
+
+Скрипт меняет название одного Кинопроизведения и ждет, пока
+запущенный ETL доставит его в индекс movies. Запускать против
+локального окружения docker-compose, сравнивая CHANGE_CAPTURE=poll
+и CHANGE_CAPTURE=notify у сервиса pg_to_es:
+
+    python -m benchmarks.notify_lag
+
+"""
+import statistics
+import time
+
+from app import config
+from app.utils import es_init, psql_connect
+
+
+RUNS = 20
+"""Кол-во изменений за прогон."""
+
+TIMEOUT = 120.0
+"""Макс. время ожидания одного изменения в секундах."""
+
+
+def wait_title(es, film_id: str, title: str) -> float:
+    """Дождаться нового названия в индексе и вернуть время ожидания."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < TIMEOUT:
+        doc = es.get(index=config.ES['MOVIES_INDEX'], id=film_id)
+        if doc['_source']['title'] == title:
+            return time.perf_counter() - start
+        time.sleep(0.01)
+    raise TimeoutError(f'Изменение {film_id} не дошло до индекса')
+
+
+def main():
+    es = es_init()
+    conn = psql_connect()
+    conn.autocommit = True
+    with conn.cursor() as curs:
+        curs.execute('SELECT id, title FROM content.film_work LIMIT 1;')
+        film_id, title = curs.fetchone()
+
+    timings = []
+    try:
+        for i in range(RUNS):
+            new_title = f'{title} [lag {i}]'
+            with conn.cursor() as curs:
+                curs.execute('UPDATE content.film_work '
+                             'SET title = %s, updated_at = now() '
+                             'WHERE id = %s;', (new_title, film_id))
+            timings.append(wait_title(es, film_id, new_title) * 1000)
+    finally:
+        with conn.cursor() as curs:
+            curs.execute('UPDATE content.film_work '
+                         'SET title = %s, updated_at = now() '
+                         'WHERE id = %s;', (title, film_id))
+        conn.close()
+
+    print(f'{config.CHANGE_CAPTURE}: median '
+          f'{statistics.median(timings):.0f} ms, '
+          f'max {max(timings):.0f} ms')
+
+
+if __name__ == '__main__':
+    main()
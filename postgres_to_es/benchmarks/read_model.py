@@ -0,0 +1,81 @@
+"""Сравнение задержки чтения Кинопроизведений: группировка по пяти
+таблицам против таблицы film_work_document, собранной триггерами.
+
+Замеряются чтение одного Кинопроизведения (карточка API), страницы
+по названию (список API) и порции id (ETL). Запускать против
+локального окружения docker-compose с примененными миграциями
+из каталога postgres_to_es (модели импортируются относительно app):
+
+    PYTHONPATH=app python -m benchmarks.read_model
+
+"""
+import statistics
+import time
+
+from app import config
+from app.etl.movies import FilmworkExtractor
+from app.utils import psql_connect
+
+
+RUNS = 200
+"""Кол-во запросов на один замер."""
+
+PAGE_SIZE = 50
+"""Размер страницы списка API."""
+
+PATHS = {
+    'group by': (FilmworkExtractor.SELECT_SQL, 'GROUP BY fw.id', 'fw'),
+    'document': (FilmworkExtractor.DOCUMENT_SQL, '', 'd')
+}
+"""Запрос каждого пути чтения без условий, группировка
+и псевдоним таблицы Кинопроизведений."""
+
+
+def measure(conn, sql: str, params_list: list) -> list[float]:
+    """Выполнить запрос с каждым набором параметров и вернуть
+    время в миллисекундах."""
+    timings = []
+    with conn.cursor() as curs:
+        for params in params_list:
+            start = time.perf_counter()
+            curs.execute(sql, params)
+            curs.fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    conn = psql_connect()
+    conn.autocommit = True
+    with conn.cursor() as curs:
+        curs.execute('SELECT id, title FROM content.film_work '
+                     'ORDER BY random() LIMIT %s;', (RUNS,))
+        films = curs.fetchall()
+    ids = [str(id) for id, _ in films]
+
+    shapes = {
+        'one': ('WHERE {t}.id = %s', '',
+                [(id,) for id in ids]),
+        'page': ('WHERE ({t}.title COLLATE "C", {t}.id) > (%s, %s)',
+                 f'ORDER BY {{t}}.title COLLATE "C", {{t}}.id '
+                 f'LIMIT {PAGE_SIZE}',
+                 [(title, str(id)) for id, title in films]),
+        'batch': ('WHERE {t}.id = ANY(%s::uuid[])', '',
+                  [((ids[i:] + ids[:i])[:config.ROWS_LIMIT],)
+                   for i in range(0, RUNS, 10)])
+    }
+    try:
+        for shape, (where, order, params_list) in shapes.items():
+            for path, (select, group_by, alias) in PATHS.items():
+                sql = ' '.join((select, where, group_by, order))
+                sql = sql.replace('{t}', alias)
+                timings = sorted(measure(conn, sql, params_list))
+                print(f'{shape} {path}: '
+                      f'median {statistics.median(timings):.2f} ms, '
+                      f'p99 {timings[int(len(timings) * 0.99)]:.2f} ms')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
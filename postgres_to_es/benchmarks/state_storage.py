@@ -0,0 +1,75 @@
+"""Сравнение задержки сохранения состояния ETL в разных хранилищах.
+
+Каждый замер - одна транзакция State с курсорами трех потоков
+изменений, как в конце прохода ETL индекса movies. Redis берется
+из настроек REDIS_*, при недоступности он пропускается.
+
+Запуск из каталога postgres_to_es:
+
+    python -m benchmarks.state_storage
+
+"""
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from redis.exceptions import ConnectionError
+
+from app.state import (BaseStorage, JsonFileStorage, RedisStorage,
+                       SqliteStorage, State)
+from app.utils import redis_init
+
+
+CHECKPOINTS = 500
+"""Кол-во сохранений состояния на одно хранилище."""
+
+KEY = 'benchmark:state'
+"""Ключ хэша Redis, чтобы не затронуть состояние ETL."""
+
+
+def checkpoint(state: State, i: int):
+    """Сохранить курсоры одного прохода ETL."""
+    updated_at = datetime.now(timezone.utc).isoformat()
+    with state.transaction():
+        for stream in ('film_work', 'film_work_genre', 'film_work_person'):
+            state.set_state(stream, updated_at)
+            state.set_state(f'{stream}_id', f'{i:032x}')
+
+
+def measure(storage: BaseStorage) -> list[float]:
+    """Замерить время сохранений в миллисекундах."""
+    state = State(storage)
+    timings = []
+    for i in range(CHECKPOINTS):
+        start = time.perf_counter()
+        checkpoint(state, i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storages = {
+            'file': JsonFileStorage(os.path.join(tmp_dir, 'state.json')),
+            'sqlite': SqliteStorage(os.path.join(tmp_dir, 'state.sqlite3'))
+        }
+        redis = redis_init()
+        try:
+            redis.ping()
+            storages['redis'] = RedisStorage(redis, key=KEY)
+        except ConnectionError:
+            print('redis: недоступен, пропущен')
+
+        for name, storage in storages.items():
+            timings = sorted(measure(storage))
+            print(f'{name}: median {statistics.median(timings):.3f} ms, '
+                  f'p99 {timings[int(len(timings) * 0.99)]:.3f} ms')
+
+        if 'redis' in storages:
+            redis.delete(KEY)
+
+
+if __name__ == '__main__':
+    main()
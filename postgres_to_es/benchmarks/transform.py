@@ -0,0 +1,58 @@
+"""Сравнение скорости трансформации Кинопроизведений: сборка каждого
+документа через pydantic против прямой сборки с выборочной проверкой.
+
+Строки имитируют результат запроса FilmworkExtractor.
+Запуск из каталога postgres_to_es (модели импортируются относительно app):
+
+    PYTHONPATH=app python -m benchmarks.transform
+
+"""
+import datetime
+import time
+import uuid
+
+from app.etl.base import transform
+from app.models.filmwork import Filmwork
+
+
+ROWS = 20000
+"""Кол-во строк на один прогон."""
+
+
+def make_row(i: int) -> dict:
+    """Собрать строку Кинопроизведения с типичным составом."""
+    people = [{'id': str(uuid.uuid4()), 'name': f'Person {i} {j}'}
+              for j in range(12)]
+    return {
+        'id': str(uuid.uuid4()),
+        'imdb_rating': 7.5,
+        'title': f'Movie {i}',
+        'description': 'Description ' * 20,
+        'creation_date': datetime.date(2000, 1, 1),
+        'file_url': None,
+        'type': 'movie',
+        'actors_names': [person['name'] for person in people[:8]],
+        'writers_names': [person['name'] for person in people[8:11]],
+        'actors': people[:8],
+        'writers': people[8:11],
+        'directors': people[11:],
+        'genres': [{'id': str(uuid.uuid4()), 'name': 'Drama'},
+                   {'id': str(uuid.uuid4()), 'name': 'Comedy'}],
+        'updated_at': datetime.datetime.now(datetime.timezone.utc)
+    }
+
+
+def main():
+    rows = [make_row(i) for i in range(ROWS)]
+    baseline = None
+    for validate_every in (1, 100, 0):
+        start = time.perf_counter()
+        transform(rows, Filmwork, validate_every)
+        rate = ROWS / (time.perf_counter() - start)
+        baseline = baseline or rate
+        print(f'validate_every={validate_every}: {rate:.0f} rows/s, '
+              f'x{rate / baseline:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+"""Тесты загрузки в Elasticsearch с повтором отклоненных действий.
+
+Запуск из каталога postgres_to_es:
+
+    PYTHONPATH=app python -m unittest discover tests
+
+"""
+from collections import Counter
+from typing import Callable, Optional
+from unittest import TestCase, mock
+
+import orjson
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import ApiError
+
+from app.etl.bulk import BulkEngine
+
+
+Status = Callable[[str, str, int], Optional[int]]
+"""Статус действия по типу операции, id и номеру попытки."""
+
+
+def api_error(status: int) -> ApiError:
+    """Собрать ошибку, которой клиент отклоняет запрос целиком."""
+    meta = ApiResponseMeta(status=status, http_version='1.1',
+                           headers=HttpHeaders(), duration=0.0,
+                           node=NodeConfig('http', 'localhost', 9200))
+    return ApiError('error', meta=meta, body={})
+
+
+class FakeElasticsearch:
+    """Клиент, отвечающий на _bulk статусами из функции status.
+
+    Если status вернул None хотя бы для одного действия,
+    запрос отклоняется целиком с 503.
+    """
+
+    def __init__(self, status: Status):
+        self.status = status
+        self.attempts = Counter()
+        self.requests = 0
+
+    def bulk(self, operations: bytes) -> dict:
+        self.requests += 1
+        lines = iter(orjson.loads(line)
+                     for line in operations.splitlines())
+        items = []
+        for meta_line in lines:
+            op_type, meta = meta_line.popitem()
+            if op_type != 'delete':
+                next(lines)
+            attempt = self.attempts[meta['_id']]
+            self.attempts[meta['_id']] += 1
+            status = self.status(op_type, meta['_id'], attempt)
+            items.append({op_type: {'_id': meta['_id'], 'status': status}})
+        if any(item[op_type]['status'] is None
+               for item in items for op_type in item):
+            raise api_error(503)
+        return {'items': items}
+
+
+def index_action(id: str, version: Optional[int] = None) -> dict:
+    action = {'_index': 'movies', '_id': id, '_source': {'id': id}}
+    if version is not None:
+        action['_version'] = version
+        action['_version_type'] = 'external'
+    return action
+
+
+def delete_action(id: str) -> dict:
+    return {'_op_type': 'delete', '_index': 'movies', '_id': id}
+
+
+class BulkEngineLoadTest(TestCase):
+
+    def setUp(self):
+        patch = mock.patch('app.etl.bulk.time.sleep')
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def load(self, status: Status, actions: list[dict], **kwargs):
+        es = FakeElasticsearch(status)
+        engine = BulkEngine(es, chunk_size=2, thread_count=2,
+                            queue_size=1, max_retries=2, **kwargs)
+        return (es, engine.load(actions)['movies'])
+
+    def test_success(self):
+        _, stats = self.load(lambda *_: 201,
+                             [index_action(str(i)) for i in range(5)])
+        self.assertEqual((stats.success, stats.failed), (5, 0))
+
+    def test_retry_rejected(self):
+        def status(op_type, id, attempt):
+            return 429 if id == '1' and attempt == 0 else 201
+
+        es, stats = self.load(status,
+                              [index_action(str(i)) for i in range(3)])
+        self.assertEqual((stats.success, stats.failed), (3, 0))
+        self.assertEqual(es.attempts, {'0': 1, '1': 2, '2': 1})
+
+    def test_retries_exhausted(self):
+        es, stats = self.load(lambda *_: 503, [index_action('1')])
+        self.assertEqual((stats.success, stats.failed), (0, 1))
+        self.assertEqual(es.attempts['1'], 3)
+
+    def test_client_error_not_retried(self):
+        es, stats = self.load(lambda *_: 400, [index_action('1')])
+        self.assertEqual((stats.success, stats.failed), (0, 1))
+        self.assertEqual(es.attempts['1'], 1)
+
+    def test_stale_external_version(self):
+        es, stats = self.load(lambda *_: 409, [index_action('1', 10)])
+        self.assertEqual((stats.success, stats.failed, stats.conflicts),
+                         (1, 0, 1))
+        self.assertEqual(es.attempts['1'], 1)
+
+    def test_conflict_without_external_version(self):
+        _, stats = self.load(lambda *_: 409, [index_action('1')])
+        self.assertEqual((stats.success, stats.failed, stats.conflicts),
+                         (0, 1, 0))
+
+    def test_delete_missing(self):
+        _, stats = self.load(lambda *_: 404, [delete_action('1')])
+        self.assertEqual((stats.success, stats.failed), (1, 0))
+
+    def test_index_not_found(self):
+        _, stats = self.load(lambda *_: 404, [index_action('1')])
+        self.assertEqual((stats.success, stats.failed), (0, 1))
+
+    def test_request_rejected(self):
+        # первая попытка всего запроса отклонена, вторая проходит
+        def status(op_type, id, attempt):
+            return None if attempt == 0 else 200
+
+        es, stats = self.load(status, [index_action('1'), delete_action('2')])
+        self.assertEqual((stats.success, stats.failed), (2, 0))
+        self.assertEqual(es.attempts, {'1': 2, '2': 2})
+
+    def test_request_rejected_with_client_error(self):
+        es = FakeElasticsearch(lambda *_: 201)
+        es.bulk = mock.Mock(side_effect=api_error(413))
+        engine = BulkEngine(es, chunk_size=2, max_retries=2)
+        stats = engine.load([index_action(str(i)) for i in range(3)])
+        self.assertEqual((stats['movies'].success, stats['movies'].failed),
+                         (0, 3))
+        self.assertEqual(es.bulk.call_count, 2)
+
+
+class BulkEngineChunksTest(TestCase):
+
+    def test_chunk_size(self):
+        engine = BulkEngine(None, chunk_size=2)
+        chunks = list(engine.chunks(index_action(str(i)) for i in range(5)))
+        self.assertEqual([len(actions) for actions, _ in chunks], [2, 2, 1])
+
+    def test_max_chunk_bytes(self):
+        action = index_action('1')
+        size = len(b''.join(body for _, body in
+                            BulkEngine(None).chunks([action])))
+        engine = BulkEngine(None, chunk_size=100, max_chunk_bytes=size * 2)
+        chunks = list(engine.chunks(index_action('1') for _ in range(5)))
+        self.assertEqual([len(actions) for actions, _ in chunks], [2, 2, 1])
+        self.assertTrue(all(len(body) <= size * 2 for _, body in chunks))
+
+    def test_delete_has_no_source_line(self):
+        engine = BulkEngine(None)
+        [(_, body)] = engine.chunks([delete_action('1')])
+        self.assertEqual(body.count(b'\n'), 1)
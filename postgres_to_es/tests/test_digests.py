@@ -0,0 +1,87 @@
+"""Тесты кэша хэшей загруженных документов.
+
+Запуск из каталога postgres_to_es:
+
+    PYTHONPATH=app python -m unittest discover tests
+
+"""
+from unittest import TestCase
+
+from app.etl.digests import DigestCache, digest
+
+
+def doc(id: str, title: str = 'Movie') -> dict:
+    """Собрать документ индекса."""
+    return {'id': id, 'title': title, 'genres': [{'id': 'g', 'name': 'N'}]}
+
+
+class DigestTest(TestCase):
+
+    def test_key_order_does_not_matter(self):
+        self.assertEqual(
+            digest({'id': '1', 'title': 'Movie', 'rating': 5.0}),
+            digest({'rating': 5.0, 'title': 'Movie', 'id': '1'})
+        )
+
+    def test_content_changes_digest(self):
+        self.assertNotEqual(digest(doc('1')), digest(doc('1', 'Renamed')))
+
+
+class DigestCacheTest(TestCase):
+
+    def load(self, cache: DigestCache, docs: list[dict]) -> list[dict]:
+        """Отобрать измененные документы и запомнить их, как после
+        успешной загрузки."""
+        changed, digests = cache.filter(docs)
+        cache.update(digests)
+        return changed
+
+    def test_unchanged_documents_are_filtered(self):
+        cache = DigestCache(max_size=10)
+        self.assertEqual(len(self.load(cache, [doc('1'), doc('2')])), 2)
+
+        changed = self.load(cache, [doc('1'), doc('2', 'Renamed')])
+
+        self.assertEqual(changed, [doc('2', 'Renamed')])
+
+    def test_digests_are_kept_only_after_update(self):
+        cache = DigestCache(max_size=10)
+        cache.filter([doc('1')])
+
+        changed, _ = cache.filter([doc('1')])
+
+        self.assertEqual(changed, [doc('1')])
+
+    def test_discard_forgets_deleted_documents(self):
+        cache = DigestCache(max_size=10)
+        self.load(cache, [doc('1'), doc('2')])
+
+        cache.discard(['1', 'missing'])
+
+        self.assertEqual(self.load(cache, [doc('1'), doc('2')]), [doc('1')])
+
+    def test_clear_forgets_all_documents(self):
+        cache = DigestCache(max_size=10)
+        self.load(cache, [doc('1')])
+
+        cache.clear()
+
+        self.assertEqual(self.load(cache, [doc('1')]), [doc('1')])
+
+    def test_least_recently_used_digest_is_evicted(self):
+        cache = DigestCache(max_size=2)
+        self.load(cache, [doc('1'), doc('2')])
+        # совпадение делает хэш недавно использованным
+        self.load(cache, [doc('1')])
+
+        self.load(cache, [doc('3')])
+
+        self.assertEqual(list(cache.digests), ['1', '3'])
+        self.assertEqual(self.load(cache, [doc('2')]), [doc('2')])
+
+    def test_disabled_cache_passes_all_documents(self):
+        cache = DigestCache(max_size=0)
+        self.load(cache, [doc('1')])
+
+        self.assertEqual(self.load(cache, [doc('1')]), [doc('1')])
+        self.assertEqual(len(cache.digests), 0)
@@ -0,0 +1,135 @@
+"""Тесты пауз ETL-потока между проходами и после ошибок.
+
+Запуск из каталога postgres_to_es:
+
+    PYTHONPATH=app python -m unittest discover tests
+
+"""
+from typing import Union
+from unittest import TestCase, mock
+
+from app.etl.base import EtlResult
+from app.scheduler import EtlWorker
+from app.state import MemoryStorage
+
+
+EMPTY = EtlResult(rows=0, has_more=False, lag=0.0)
+"""Проход без новых данных."""
+
+PARTIAL = EtlResult(rows=10, has_more=False, lag=0.0)
+"""Проход с неполным батчем."""
+
+FULL = EtlResult(rows=100, has_more=True, lag=5.0)
+"""Проход с полным батчем, данные остались."""
+
+
+class FakeEvent:
+    """Событие остановки, которое не ждет, а копит запрошенные паузы.
+
+    Сумма пауз - время по часам потока.
+    """
+
+    def __init__(self):
+        self.stopped = False
+        self.waits = []
+
+    def is_set(self) -> bool:
+        return self.stopped
+
+    def set(self):
+        self.stopped = True
+
+    def wait(self, timeout: float) -> bool:
+        if not self.stopped:
+            self.waits.append(timeout)
+        return self.stopped
+
+    @property
+    def clock(self) -> float:
+        return sum(self.waits)
+
+
+class FakeEtl:
+    """ETL, возвращающий результаты проходов по сценарию.
+
+    Исключение в сценарии выбрасывается вместо результата, после
+    конца сценария поток останавливается.
+    """
+
+    def __init__(self, script: list[Union[EtlResult, Exception]],
+                 stop_event: FakeEvent):
+        self.script = list(script)
+        self.stop_event = stop_event
+
+    def etl(self) -> EtlResult:
+        if not self.script:
+            self.stop_event.set()
+            return EMPTY
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+class EtlWorkerTest(TestCase):
+
+    def setUp(self):
+        patches = [
+            mock.patch('app.scheduler.psql_connect'),
+            mock.patch('app.scheduler.storage_init', MemoryStorage),
+            mock.patch('app.scheduler.config.IDLE_SLEEP_MAX_SECONDS', 8.0),
+            mock.patch('app.scheduler.config.BACKOFF_MAX_TIME', 0.3),
+            mock.patch('app.scheduler.logging')
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def run_worker(self, script: list) -> FakeEvent:
+        """Выполнить поток по сценарию и вернуть его паузы."""
+        stop_event = FakeEvent()
+        etl = FakeEtl(script, stop_event)
+        create_etl = mock.Mock(return_value=etl)
+        worker = EtlWorker(name='movies', create_etl=create_etl, es=None,
+                           poll_interval=1.0, stop_event=stop_event)
+        worker.run()
+        self.create_etl = create_etl
+        return stop_event
+
+    def test_idle_delay_doubles_up_to_max(self):
+        stop_event = self.run_worker([EMPTY] * 6)
+
+        self.assertEqual(stop_event.waits, [1.0, 2.0, 4.0, 8.0, 8.0, 8.0])
+        self.assertEqual(stop_event.clock, 31.0)
+
+    def test_new_rows_reset_idle_delay(self):
+        stop_event = self.run_worker([EMPTY, EMPTY, EMPTY, PARTIAL, EMPTY])
+
+        self.assertEqual(stop_event.waits, [1.0, 2.0, 4.0, 1.0, 1.0])
+
+    def test_full_batch_resets_idle_delay_without_waiting(self):
+        stop_event = self.run_worker([EMPTY, EMPTY, EMPTY, FULL, FULL,
+                                      EMPTY, EMPTY])
+
+        self.assertEqual(stop_event.waits, [1.0, 2.0, 4.0, 1.0, 2.0])
+
+    def test_full_batch_without_rows_resets_idle_delay(self):
+        has_more = EtlResult(rows=0, has_more=True, lag=5.0)
+        stop_event = self.run_worker([EMPTY, EMPTY, EMPTY, has_more,
+                                      EMPTY])
+
+        self.assertEqual(stop_event.waits, [1.0, 2.0, 4.0, 1.0])
+
+    def test_errors_back_off_exponentially_up_to_max(self):
+        error = ConnectionError('Postgres недоступен')
+        stop_event = self.run_worker([error] * 4)
+
+        self.assertEqual(stop_event.waits, [0.1, 0.2, 0.3, 0.3])
+        # после каждой ошибки поток переподключается
+        self.assertEqual(self.create_etl.call_count, 5)
+
+    def test_success_resets_error_delay(self):
+        error = ConnectionError('Postgres недоступен')
+        stop_event = self.run_worker([error, error, PARTIAL, error])
+
+        self.assertEqual(stop_event.waits, [0.1, 0.2, 1.0, 0.1])
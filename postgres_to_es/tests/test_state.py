@@ -0,0 +1,154 @@
+"""Тесты хранилищ состояния ETL и транзакций State.
+
+Запуск из каталога postgres_to_es:
+
+    PYTHONPATH=app python -m unittest discover tests
+
+"""
+import multiprocessing
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import fakeredis
+
+from app.state import (LEGACY_KEYS, JsonFileStorage, MemoryStorage,
+                       RedisStorage, SqliteStorage, State)
+
+
+WRITES = 20
+"""Кол-во сохранений каждого параллельного писателя."""
+
+
+def write_keys(path: str, writer: int):
+    """Сохранять в файл собственные ключи писателя по одному."""
+    storage = JsonFileStorage(path)
+    for i in range(WRITES):
+        storage.save_state({f'writer{writer}_{i}': str(i)})
+
+
+class RedisStorageTest(TestCase):
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis(decode_responses=True)
+        self.storage = RedisStorage(self.redis, key='state')
+
+    def test_save_state_in_one_transaction(self):
+        with mock.patch.object(self.redis, 'pipeline',
+                               wraps=self.redis.pipeline) as pipeline:
+            self.storage.save_state({'film_work': '2022-01-01',
+                                     'film_work_id': 'a'})
+
+        pipeline.assert_called_once_with(transaction=True)
+        self.assertEqual(self.redis.hgetall('state'),
+                         {'film_work': '2022-01-01', 'film_work_id': 'a'})
+
+    def test_save_state_keeps_other_keys(self):
+        self.storage.save_state({'genre': '2022-01-01'})
+        self.storage.save_state({'person': '2022-01-02'})
+
+        self.assertEqual(self.storage.retrieve_state(),
+                         {'genre': '2022-01-01', 'person': '2022-01-02'})
+
+    def test_legacy_keys_are_read_at_once_and_migrated(self):
+        self.redis.set('film_work', '2022-01-01')
+        self.redis.set('person', '2022-01-02')
+
+        with mock.patch.object(self.redis, 'mget',
+                               wraps=self.redis.mget) as mget:
+            state = self.storage.retrieve_state()
+
+        mget.assert_called_once_with(LEGACY_KEYS)
+        self.assertEqual(state, {'film_work': '2022-01-01',
+                                 'person': '2022-01-02'})
+        self.assertEqual(self.redis.hgetall('state'), state)
+
+    def test_hash_takes_precedence_over_legacy_keys(self):
+        self.redis.set('film_work', '2022-01-01')
+        self.storage.save_state({'film_work': '2022-02-01'})
+
+        self.assertEqual(self.storage.retrieve_state(),
+                         {'film_work': '2022-02-01'})
+
+
+class JsonFileStorageTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'state.json')
+
+    def test_missing_file_is_empty_state(self):
+        self.assertEqual(JsonFileStorage(self.path).retrieve_state(), {})
+
+    def test_save_state_merges_with_saved(self):
+        JsonFileStorage(self.path).save_state({'genre': '1'})
+        JsonFileStorage(self.path).save_state({'person': '2',
+                                               'genre': '3'})
+
+        self.assertEqual(JsonFileStorage(self.path).retrieve_state(),
+                         {'genre': '3', 'person': '2'})
+        self.assertFalse(os.path.exists(f'{self.path}.tmp'))
+
+    def test_concurrent_writers_keep_all_keys(self):
+        writers = [multiprocessing.Process(target=write_keys,
+                                           args=(self.path, writer))
+                   for writer in range(4)]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+
+        self.assertTrue(all(writer.exitcode == 0 for writer in writers))
+        state = JsonFileStorage(self.path).retrieve_state()
+        self.assertEqual(len(state), 4 * WRITES)
+
+
+class SqliteStorageTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'state.db')
+
+    def test_save_state_upserts_keys(self):
+        storage = SqliteStorage(self.path)
+        self.addCleanup(storage.connection.close)
+        storage.save_state({'genre': '1', 'person': '2'})
+        storage.save_state({'genre': '3'})
+
+        reopened = SqliteStorage(self.path)
+        self.addCleanup(reopened.connection.close)
+        self.assertEqual(reopened.retrieve_state(),
+                         {'genre': '3', 'person': '2'})
+
+
+class StateTransactionTest(TestCase):
+
+    def setUp(self):
+        self.storage = MemoryStorage({'genre': '1'})
+        self.state = State(self.storage)
+
+    def test_changes_are_saved_once_on_success(self):
+        with mock.patch.object(self.storage, 'save_state',
+                               wraps=self.storage.save_state) as save_state:
+            with self.state.transaction():
+                self.state.set_state('genre', '2')
+                self.state.set_state('genre_id', 'a')
+
+        save_state.assert_called_once_with({'genre': '2', 'genre_id': 'a'})
+        self.assertEqual(self.state.get_state('genre'), '2')
+
+    def test_changes_are_dropped_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.state.transaction():
+                self.state.set_state('genre', '2')
+                raise RuntimeError
+
+        self.assertEqual(self.state.get_state('genre'), '1')
+        self.assertEqual(self.storage.retrieve_state(), {'genre': '1'})
+
+        # после отката set_state снова сохраняет сразу
+        self.state.set_state('person', '3')
+        self.assertEqual(self.storage.retrieve_state(),
+                         {'genre': '1', 'person': '3'})
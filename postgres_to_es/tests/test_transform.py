@@ -0,0 +1,113 @@
+"""Тесты трансформации строк Postgres в документы ES.
+
+Модели импортируются относительно app, поэтому запуск из каталога
+postgres_to_es:
+
+    PYTHONPATH=app python -m unittest discover tests
+
+"""
+import datetime
+import uuid
+from unittest import TestCase
+
+import orjson
+from pydantic import ValidationError
+
+from app.etl.base import transform
+from app.models.filmwork import Filmwork
+from app.models.genre import Genre
+from app.models.person import Person
+
+
+def person(name: str) -> dict:
+    """Собрать вложенную запись, как ее отдает json_agg."""
+    return {'id': str(uuid.uuid4()), 'name': name}
+
+
+FILMWORK_ROWS = [
+    {
+        'id': str(uuid.uuid4()),
+        'imdb_rating': 8.5,
+        'title': 'Star Wars',
+        'description': 'A long time ago',
+        'creation_date': datetime.date(1977, 5, 25),
+        'file_url': 'file:///movies/star_wars.mp4',
+        'type': 'movie',
+        'actors_names': ['Carrie Fisher', 'Mark Hamill'],
+        'writers_names': ['George Lucas'],
+        'actors': [person('Mark Hamill'), person('Carrie Fisher')],
+        'writers': [person('George Lucas')],
+        'directors': [person('George Lucas')],
+        'genres': [person('Sci-Fi')],
+        'updated_at': datetime.datetime(2022, 1, 1,
+                                        tzinfo=datetime.timezone.utc),
+        'version_at': datetime.datetime(2022, 1, 2,
+                                        tzinfo=datetime.timezone.utc)
+    },
+    {
+        'id': str(uuid.uuid4()),
+        'imdb_rating': None,
+        'title': 'Untitled',
+        'description': None,
+        'creation_date': None,
+        'file_url': None,
+        'type': 'tv_show',
+        'actors_names': [],
+        'writers_names': [],
+        'actors': [],
+        'writers': [],
+        'directors': [],
+        'genres': [],
+        'updated_at': datetime.datetime(2022, 1, 1,
+                                        tzinfo=datetime.timezone.utc),
+        'version_at': datetime.datetime(2022, 1, 1,
+                                        tzinfo=datetime.timezone.utc)
+    }
+]
+"""Строки Кинопроизведений в формате запроса FilmworkExtractor."""
+
+GENRE_ROWS = [
+    {'id': str(uuid.uuid4()), 'name': 'Drama', 'description': 'Serious',
+     'version_at': datetime.datetime(2022, 1, 1)},
+    {'id': str(uuid.uuid4()), 'name': 'Comedy', 'description': None,
+     'version_at': datetime.datetime(2022, 1, 1)}
+]
+"""Строки жанров в формате запроса GenreExtractor."""
+
+PERSON_ROWS = [
+    {'id': str(uuid.uuid4()), 'full_name': 'George Lucas',
+     'roles': ['director', 'writer'],
+     'film_ids': [str(uuid.uuid4()), str(uuid.uuid4())]},
+    {'id': str(uuid.uuid4()), 'full_name': 'Nobody', 'roles': [],
+     'film_ids': []}
+]
+"""Строки персон в формате запроса PersonExtractor."""
+
+
+class TransformTest(TestCase):
+
+    def assertSameDocuments(self, rows: list, model: type):
+        """Проверить, что быстрый путь дает те же документы в ES,
+        что и сборка моделью pydantic."""
+        fast = transform(rows, model, validate_every=0)
+        validated = transform(rows, model, validate_every=1)
+        # в ES уходит JSON, поэтому UUID и строка с ним равноценны
+        self.assertEqual([orjson.loads(orjson.dumps(doc)) for doc in fast],
+                         [orjson.loads(orjson.dumps(doc))
+                          for doc in validated])
+
+    def test_filmwork_fast_path_matches_model(self):
+        self.assertSameDocuments(FILMWORK_ROWS, Filmwork)
+
+    def test_genre_fast_path_matches_model(self):
+        self.assertSameDocuments(GENRE_ROWS, Genre)
+
+    def test_person_fast_path_matches_model(self):
+        self.assertSameDocuments(PERSON_ROWS, Person)
+
+    def test_fast_path_validates_sampled_rows(self):
+        rows = [dict(GENRE_ROWS[0]), dict(GENRE_ROWS[1], name=None)]
+
+        transform(rows, Genre, validate_every=2)
+        with self.assertRaises(ValidationError):
+            transform(rows[::-1], Genre, validate_every=2)